@@ -0,0 +1,301 @@
+"""
+Benchmarks for the solvers and the generator over a fixed corpus of seeded boards.
+
+Run from the repository root, saving results before a change and comparing against them after:
+
+    python -m benchmarks.bench --save before.json
+    python -m benchmarks.bench --baseline before.json
+
+Timings depend on the machine, so there's no stored baseline: record one on the same machine
+before comparing.
+
+Every case reports the median/p95 time of a run, the median number of search nodes of a run and
+the peak memory allocated by a run. Runs are stopped after --time-limit seconds and counted as
+timeouts, with the limit as their time. Cases whose median time or nodes grew by more than the
+tolerance compared to the baseline, or that timed out more often, are flagged as regressions and
+make the command exit with 1.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from multiprocessing import Pool
+from typing import Callable
+
+from board.bitboard import BitBoard
+from board.generator import Generator
+from board.propagation_solver import PropagationSolver
+from board.row_solver import RowSolver
+from board.sat_solver import SatSolver
+from board.search_stats import search_stats
+from board.solver import Solver
+from board.solver_backends import AutoSolver
+from game.game_config import config
+from utils import generate_random_posn, generate_random_symbol
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus.jsonl")
+
+# mapping of grid size => seeds of the boards in the corpus. 12x12 boards take a while to generate
+# so there are only a few of them. Reducing the signs of 12x12 seed 0 takes over an hour, it's kept
+# as the generator's worst case and shows up as a reduce_signs timeout.
+CORPUS_SEEDS = {6: range(5), 8: range(5), 10: range(3), 12: range(3)}
+
+# seconds a single run (or corpus phase) may take before it's stopped
+TIME_LIMIT = 120
+
+# mapping of solver => largest grid size it's benchmarked on, the backtracker and the SAT encoding
+# don't finish on larger puzzles
+SOLVERS = {
+    "Solver": (Solver, 8),
+    "PropagationSolver": (PropagationSolver, 12),
+    "RowSolver": (RowSolver, 12),
+    "SatSolver": (SatSolver, 8),
+    "AutoSolver": (AutoSolver, 12),
+}
+
+
+class RunTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """
+    Raises RunTimeout in the block once it has run for `seconds`. This relies on SIGALRM, so there's
+    no limit where it's missing (Windows).
+    """
+    if not seconds or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise RunTimeout()
+
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def _build_record(task: tuple[int, int, float]) -> dict:
+    """
+    Runs every generation phase for one seed and keeps the board each phase starts from. If
+    reducing the signs takes longer than the time limit, the record has no reduced board or puzzle.
+    """
+    grid_size, seed, time_limit = task
+    config.grid_size = grid_size
+    random.seed(f"bench:{grid_size}:{seed}")
+
+    board = Generator.generate_board_symbols()
+    solution = board.to_text()
+
+    Generator.populate_signs(board)
+    board.clear_board()
+    board.set_symbol_at_posn(generate_random_posn(), generate_random_symbol())
+    signed = board.to_text()
+
+    record = {
+        "grid_size": grid_size,
+        "seed": seed,
+        "solution": solution,
+        "signed": signed,
+        "reduced": None,
+        "puzzle": None,
+    }
+
+    try:
+        with _time_limit(time_limit):
+            Generator.reduce_signs(board)
+    except RunTimeout:
+        return record
+    record["reduced"] = board.to_text()
+
+    Generator.populate_symbols(board)
+    record["puzzle"] = board.to_text()
+
+    return record
+
+
+def build_corpus(worker_count: int, time_limit: float) -> None:
+    tasks = [(grid_size, seed, time_limit) for grid_size, seeds in CORPUS_SEEDS.items() for seed in seeds]
+
+    with Pool(worker_count) as pool, open(CORPUS_PATH, "w") as f:
+        for record in pool.imap(_build_record, tasks):
+            f.write(json.dumps(record) + "\n")
+
+
+def _load_corpus(grid_size: int) -> list[dict]:
+    with open(CORPUS_PATH) as f:
+        records = [json.loads(line) for line in f]
+
+    return [record for record in records if record["grid_size"] == grid_size]
+
+
+def _get_cases(grid_size: int, records: list[dict]) -> dict[str, list[Callable[[], object]]]:
+    """
+    Returns the runs of every case for a grid size. A run works on its own copy of the board.
+    Boards whose signs couldn't be reduced when building the corpus only run in reduce_signs and
+    the phases before it.
+    """
+    config.grid_size = grid_size
+    puzzles = [BitBoard.from_text(record["puzzle"]) for record in records if record["puzzle"] is not None]
+    cases = {}
+
+    for name, (solver, max_grid_size) in SOLVERS.items():
+        if grid_size > max_grid_size:
+            continue
+
+        cases[f"{name}.solve"] = [lambda solver=solver, b=b: solver.solve(b.copy()) for b in puzzles]
+        cases[f"{name}.get_num_solutions"] = [lambda solver=solver, b=b: solver.get_num_solutions(b.copy()) for b in puzzles]
+
+    cases["Solver.is_intuitively_solvable"] = [lambda b=b: Solver.is_intuitively_solvable(b.copy()) for b in puzzles]
+
+    def run_phase(phase: Callable[[BitBoard], object], text: str, seed: int) -> None:
+        board = BitBoard.from_text(text)
+        random.seed(f"bench:{grid_size}:{seed}")
+        phase(board)
+
+    cases["Generator.generate_board_symbols"] = [
+        lambda text=record["solution"], seed=record["seed"]: run_phase(lambda _: Generator.generate_board_symbols(), text, seed)
+        for record in records
+    ]
+    for phase_name, phase, key in (
+        ("populate_signs", Generator.populate_signs, "solution"),
+        ("reduce_signs", Generator.reduce_signs, "signed"),
+        ("populate_symbols", Generator.populate_symbols, "reduced"),
+    ):
+        cases[f"Generator.{phase_name}"] = [
+            lambda phase=phase, text=record[key], seed=record["seed"]: run_phase(phase, text, seed)
+            for record in records
+            if record[key] is not None
+        ]
+
+    return cases
+
+
+def _run_case(runs: list[Callable[[], object]], repeat: int, time_limit: float) -> dict:
+    times = []
+    nodes = []
+
+    # runs are seeded, so a run that timed out once would time out again and isn't repeated
+    timed_out = {}
+
+    search_stats.enabled = True
+    for _ in range(repeat):
+        for k, run in enumerate(runs):
+            if k in timed_out:
+                times.append(time_limit)
+                nodes.append(timed_out[k])
+                continue
+
+            search_stats.reset()
+            start_time = time.perf_counter()
+            try:
+                with _time_limit(time_limit):
+                    run()
+            except RunTimeout:
+                timed_out[k] = search_stats.nodes
+            times.append(time.perf_counter() - start_time)
+            nodes.append(search_stats.nodes)
+    search_stats.enabled = False
+
+    # memory is measured separately since tracing allocations slows the runs down
+    peak_memory = 0
+    for k, run in enumerate(runs):
+        if k in timed_out:
+            continue
+
+        tracemalloc.start()
+        run()
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    times.sort()
+    return {
+        "median": statistics.median(times),
+        "p95": times[min(len(times) - 1, round(0.95 * (len(times) - 1)))],
+        "nodes": statistics.median(nodes),
+        "memory": peak_memory,
+        "timeouts": len(timed_out),
+    }
+
+
+def _compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for case, result in results.items():
+        if case not in baseline:
+            continue
+
+        for metric in ("median", "nodes"):
+            if result[metric] > baseline[case][metric] * (1 + tolerance):
+                regressions.append(f"{case} {metric}: {baseline[case][metric]:.6g} -> {result[metric]:.6g}")
+
+        # baselines saved before timeouts were recorded have none
+        if result["timeouts"] > baseline[case].get("timeouts", 0):
+            regressions.append(f"{case} timeouts: {baseline[case].get('timeouts', 0)} -> {result['timeouts']}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--grid-sizes", type=int, nargs="+", default=list(CORPUS_SEEDS), help="Grid sizes to benchmark")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of times every board is run")
+    parser.add_argument("--save", help="File to save the results to")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging a regression")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="Seconds a run may take before it's counted as a timeout, 0 for no limit")
+    parser.add_argument("--build-corpus", action="store_true", help="Regenerate the corpus of seeded boards")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes used to build the corpus")
+    args = parser.parse_args()
+
+    if args.build_corpus:
+        build_corpus(args.workers, args.time_limit)
+        return 0
+
+    results = {}
+    for grid_size in args.grid_sizes:
+        records = _load_corpus(grid_size)
+        for case, runs in _get_cases(grid_size, records).items():
+            name = f"{case}[{grid_size}x{grid_size}]"
+            # every board of the grid size may have timed out when building the corpus
+            if args.filter not in name or not runs:
+                continue
+
+            results[name] = _run_case(runs, args.repeat, args.time_limit)
+            result = results[name]
+            print(
+                f"{name:<50} median {result['median'] * 1000:10.2f}ms  p95 {result['p95'] * 1000:10.2f}ms  "
+                f"nodes {result['nodes']:>10.0f}  memory {result['memory'] / 1024:8.1f}KiB"
+                + (f"  timeouts {result['timeouts']}" if result["timeouts"] else "")
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _compare(results, json.load(f), args.tolerance)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import json
+import random
+import time
+from multiprocessing import Pool
+
+from board.bitboard import BitBoard
+from board.generator import Generator
+from board.puzzle_library import PuzzleLibrary
+from board.solver_backends import get_solver_backend
+from board.symmetry import get_canonical_key
+from constants import MIN_GRID_SIZE, WORKER_COUNT
+from game.game_config import config
+
+# rounds in a row that only produce duplicates before giving up on finding more distinct puzzles,
+# which small grids run out of
+MAX_ROUNDS_WITHOUT_NEW_PUZZLES = 3
+
+
+def _init_worker(grid_size: int, solver: str) -> None:
+    config.grid_size = grid_size
+    Generator.solver = get_solver_backend(solver)
+
+
+def _generate_puzzle(task: tuple[int, int]) -> tuple[int, bytes, bytes, bytes]:
+    seed, index = task
+
+    # every puzzle gets its own random stream, so a run produces the same puzzles no matter how
+    # many workers there are or which worker picks up which puzzle
+    random.seed(f"{seed}:{index}")
+
+    board = Generator.generate()
+    solved_board = board.copy()
+    Generator.solver.solve(solved_board)
+
+    return index, board.to_bytes(), solved_board.to_bytes(), get_canonical_key(board)
+
+
+class BatchGenerator:
+    @staticmethod
+    def generate(
+        num_puzzles: int,
+        grid_size: int,
+        output_path: str,
+        output_format: str = "jsonl",
+        worker_count: int = WORKER_COUNT,
+        seed: int = 0,
+        solver: str = "auto",
+    ) -> float:
+        """
+        Generates puzzles across `worker_count` processes and streams them to `output_path` as they
+        complete, either as one JSON object per line or into the puzzle library at that path.
+        Returns the number of puzzles generated per second. Puzzles are solved and checked with the
+        solver backend named `solver` (see solver_backends).
+
+        Puzzles that are the same as an earlier one up to rotation, reflection or swapping suns and
+        moons are dropped (see symmetry.get_canonical_key), and more are generated in their place
+        until there are `num_puzzles` distinct puzzles, or until MAX_ROUNDS_WITHOUT_NEW_PUZZLES rounds
+        in a row turn up no new puzzle, in which case fewer puzzles are written. Puzzles keep the
+        index of the random stream they were generated from, so the indices of a batch can have
+        gaps.
+        """
+        if output_format not in ("jsonl", "binary"):
+            raise ValueError(f"Unknown output format {output_format}")
+
+        # other grids have no solutions (odd sizes) or too few to make puzzles from, and would fail
+        # inside the workers
+        if grid_size < MIN_GRID_SIZE or grid_size % 2:
+            raise ValueError(f"Grid size must be even and at least {MIN_GRID_SIZE}, got {grid_size}")
+
+        config.grid_size = grid_size
+
+        # fail before starting the workers if there's no such solver
+        get_solver_backend(solver)
+
+        library = PuzzleLibrary(output_path) if output_format == "binary" else None
+        jsonl_file = open(output_path, "w") if output_format == "jsonl" else None
+
+        # canonical keys of the puzzles written so far
+        canonical_keys = set()
+        num_tasks = 0
+        num_duplicates = 0
+        num_rounds_without_new_puzzles = 0
+
+        start_time = time.time()
+        try:
+            with Pool(worker_count, initializer=_init_worker, initargs=(grid_size, solver)) as pool:
+                # tasks are handed out in rounds, each one replacing the duplicates of the last
+                while len(canonical_keys) < num_puzzles and num_rounds_without_new_puzzles < MAX_ROUNDS_WITHOUT_NEW_PUZZLES:
+                    num_found = len(canonical_keys)
+                    tasks = [(seed, index) for index in range(num_tasks, num_tasks + num_puzzles - len(canonical_keys))]
+                    num_tasks += len(tasks)
+
+                    # results are taken in order so the same puzzle of a set of duplicates is kept
+                    # no matter which worker finishes first
+                    results = pool.imap(_generate_puzzle, tasks)
+                    for index, board_bytes, solved_board_bytes, canonical_key in results:
+                        board = BitBoard.from_bytes(board_bytes)
+                        if canonical_key in canonical_keys or (library is not None and library.find(board) is not None):
+                            num_duplicates += 1
+                            continue
+
+                        canonical_keys.add(canonical_key)
+
+                        if library is not None:
+                            library.add(board, BitBoard.from_bytes(solved_board_bytes))
+                        else:
+                            record = {
+                                "index": index,
+                                "seed": seed,
+                                "grid_size": grid_size,
+                                "board": board.to_text(),
+                                "solution": BitBoard.from_bytes(solved_board_bytes).to_text(),
+                            }
+                            jsonl_file.write(json.dumps(record) + "\n")
+                            jsonl_file.flush()
+
+                    if len(canonical_keys) == num_found:
+                        num_rounds_without_new_puzzles += 1
+                    else:
+                        num_rounds_without_new_puzzles = 0
+        finally:
+            if library is not None:
+                library.close()
+            if jsonl_file is not None:
+                jsonl_file.close()
+
+        elapsed_time = time.time() - start_time
+        num_generated = len(canonical_keys)
+        puzzles_per_second = num_generated / elapsed_time if elapsed_time > 0 else float("inf")
+        print(f"Generated {num_generated} puzzles in {elapsed_time:.2f}s ({puzzles_per_second:.2f} puzzles/s)")
+        if num_duplicates:
+            print(f"Dropped {num_duplicates} duplicate puzzles")
+        if num_generated < num_puzzles:
+            print(
+                f"Only found {num_generated} of {num_puzzles} distinct puzzles, the last "
+                f"{MAX_ROUNDS_WITHOUT_NEW_PUZZLES} rounds produced nothing but duplicates"
+            )
+
+        return puzzles_per_second
@@ -0,0 +1,93 @@
+import numpy as np
+
+from board.board import Board
+from game.game_config import config
+from tango_types import DIRECTION, SYMBOL
+
+# codes of the edge arrays, same as the 2-bit sign codes of Board.to_bytes
+EDGE_NONE = 0
+EDGE_EQUAL = 1
+EDGE_TIMES = 2
+
+
+def boards_to_arrays(boards: list[Board]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Packs boards of the current grid size into the arrays taken by validate_boards:
+
+    1. (N, n, n) symbol values
+    2. (N, n, n - 1) edge codes of the signs between (i, j) and (i, j + 1)
+    3. (N, n - 1, n) edge codes of the signs between (i, j) and (i + 1, j)
+    """
+    n = config.grid_size
+    symbols = np.empty((len(boards), n, n), dtype=np.uint8)
+    right_signs = np.zeros((len(boards), n, n - 1), dtype=np.uint8)
+    down_signs = np.zeros((len(boards), n - 1, n), dtype=np.uint8)
+
+    for k, board in enumerate(boards):
+        symbols[k] = [[board.get_symbol_at_posn((i, j)).value for j in range(n)] for i in range(n)]
+
+        for (i, j), sign_set in board.get_all_signs().items():
+            for dir, sign in sign_set:
+                if dir == DIRECTION.RIGHT:
+                    right_signs[k, i, j] = sign.value + 1
+                else:
+                    down_signs[k, i, j] = sign.value + 1
+
+    return symbols, right_signs, down_signs
+
+
+def _has_triple(mask: np.ndarray) -> np.ndarray:
+    """
+    Returns which boards of an (N, n, n) mask have 3 consecutive set tiles in a row or column.
+    """
+    rows = mask[:, :, :-2] & mask[:, :, 1:-1] & mask[:, :, 2:]
+    cols = mask[:, :-2, :] & mask[:, 1:-1, :] & mask[:, 2:, :]
+    return rows.any(axis=(1, 2)) | cols.any(axis=(1, 2))
+
+
+def _breaks_signs(symbols: np.ndarray, filled: np.ndarray, signs: np.ndarray, axis: int) -> np.ndarray:
+    """
+    Returns which boards have a sign along `axis` (2 = going right, 1 = going down) between two
+    filled tiles that don't match it.
+    """
+    n = symbols.shape[axis]
+    first = np.arange(n - 1)
+    second = np.arange(1, n)
+
+    both_filled = filled.take(first, axis=axis) & filled.take(second, axis=axis)
+    same = symbols.take(first, axis=axis) == symbols.take(second, axis=axis)
+    broken = ((signs == EDGE_EQUAL) & ~same) | ((signs == EDGE_TIMES) & same)
+
+    return (both_filled & broken).any(axis=(1, 2))
+
+
+def validate_boards(
+    symbols: np.ndarray, right_signs: np.ndarray, down_signs: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Checks N boards at once, given as the arrays returned by boards_to_arrays. Returns (valid,
+    solved) boolean arrays of shape (N,) that agree with Board.is_valid and Board.is_solved:
+    guesses count as empty tiles, and a board is solved if it's valid and every tile is filled.
+    """
+    symbols = np.asarray(symbols)
+    half = symbols.shape[-1] // 2
+
+    is_sun = symbols == SYMBOL.SUN.value
+    is_moon = symbols == SYMBOL.MOON.value
+    filled = is_sun | is_moon
+
+    valid = np.ones(len(symbols), dtype=bool)
+    for mask in (is_sun, is_moon):
+        # no more than (size / 2) of one symbol in a row/column
+        valid &= (mask.sum(axis=2) <= half).all(axis=1) & (mask.sum(axis=1) <= half).all(axis=1)
+
+        # no 3 consecutive tiles with the same symbol
+        valid &= ~_has_triple(mask)
+
+    valid &= ~_breaks_signs(symbols, filled, np.asarray(right_signs), axis=2)
+    valid &= ~_breaks_signs(symbols, filled, np.asarray(down_signs), axis=1)
+
+    # a filled row/column can't have fewer than (size / 2) of a symbol without having more of the other
+    solved = valid & filled.all(axis=(1, 2))
+
+    return valid, solved
@@ -0,0 +1,171 @@
+from board.board import Board
+from board.search_stats import search_stats
+from game.game_config import config
+from tango_types import DIRECTION, SIGN, SYMBOL, Posn
+
+
+def _is_line_valid(sun: int, moon: int, sun_count: int, moon_count: int, equal: int, times: int) -> bool:
+    """
+    Checks a single row/column held as bitmasks, where bit k is the k-th tile of the line.
+    `equal` and `times` have bit k set if there is a sign between tile k and tile k + 1.
+    """
+    if sun_count > config.grid_size / 2 or moon_count > config.grid_size / 2:
+        return False
+
+    # no 3 consecutive tiles with the same symbol
+    if sun & (sun >> 1) & (sun >> 2) or moon & (moon >> 1) & (moon >> 2):
+        return False
+
+    # bit k is set if tiles k and k + 1 are both filled and the same/different
+    same = (sun & (sun >> 1)) | (moon & (moon >> 1))
+    different = (sun & (moon >> 1)) | (moon & (sun >> 1))
+
+    return not (same & times or different & equal)
+
+
+class BitBoard(Board):
+    """
+    Board backend that mirrors the symbols as a pair of bitmasks (suns, moons) for every row and
+    column, along with the number of suns/moons in each of them. Bit j of a row mask is column j
+    and bit i of a column mask is row i. Signs are kept as bitmasks as well, so validating a line
+    is a handful of bit operations instead of a scan over its tiles.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset_symbol_masks()
+
+        # bit j of _row_equal[i] is set if there is a "=" between (i, j) and (i, j + 1), and
+        # bit i of _col_equal[j] is set if there is a "=" between (i, j) and (i + 1, j)
+        self._row_equal = [0] * config.grid_size
+        self._row_times = [0] * config.grid_size
+        self._col_equal = [0] * config.grid_size
+        self._col_times = [0] * config.grid_size
+
+    def _reset_symbol_masks(self) -> None:
+        self._row_sun = [0] * config.grid_size
+        self._row_moon = [0] * config.grid_size
+        self._col_sun = [0] * config.grid_size
+        self._col_moon = [0] * config.grid_size
+
+        self._row_sun_count = [0] * config.grid_size
+        self._row_moon_count = [0] * config.grid_size
+        self._col_sun_count = [0] * config.grid_size
+        self._col_moon_count = [0] * config.grid_size
+
+    def set_symbol_at_posn(self, posn: Posn, symbol: SYMBOL) -> None:
+        i, j = posn
+        prev_symbol = self.get_symbol_at_posn(posn)
+
+        super().set_symbol_at_posn(posn, symbol)
+
+        # remove the old symbol from the masks
+        match prev_symbol:
+            case SYMBOL.SUN:
+                self._row_sun[i] &= ~(1 << j)
+                self._col_sun[j] &= ~(1 << i)
+                self._row_sun_count[i] -= 1
+                self._col_sun_count[j] -= 1
+            case SYMBOL.MOON:
+                self._row_moon[i] &= ~(1 << j)
+                self._col_moon[j] &= ~(1 << i)
+                self._row_moon_count[i] -= 1
+                self._col_moon_count[j] -= 1
+
+        # add the new symbol to the masks, guesses are not tracked
+        match symbol:
+            case SYMBOL.SUN:
+                self._row_sun[i] |= 1 << j
+                self._col_sun[j] |= 1 << i
+                self._row_sun_count[i] += 1
+                self._col_sun_count[j] += 1
+            case SYMBOL.MOON:
+                self._row_moon[i] |= 1 << j
+                self._col_moon[j] |= 1 << i
+                self._row_moon_count[i] += 1
+                self._col_moon_count[j] += 1
+
+    def set_sign(self, from_posn: Posn, to_posn: Posn, sign: SIGN) -> None:
+        super().set_sign(from_posn, to_posn, sign)
+
+        i, j = from_posn
+        if to_posn == (i, j + 1):
+            target = self._row_equal if sign == SIGN.EQUAL else self._row_times
+            target[i] |= 1 << j
+        else:
+            target = self._col_equal if sign == SIGN.EQUAL else self._col_times
+            target[j] |= 1 << i
+
+    def remove_sign(self, from_posn: Posn, dir: DIRECTION) -> None:
+        super().remove_sign(from_posn, dir)
+
+        i, j = from_posn
+        match dir:
+            case DIRECTION.RIGHT:
+                self._row_equal[i] &= ~(1 << j)
+                self._row_times[i] &= ~(1 << j)
+            case DIRECTION.DOWN:
+                self._col_equal[j] &= ~(1 << i)
+                self._col_times[j] &= ~(1 << i)
+
+    def is_filled(self) -> bool:
+        return all(
+            self._row_sun_count[i] + self._row_moon_count[i] == config.grid_size
+            for i in range(config.grid_size)
+        )
+
+    def is_valid(self) -> bool:
+        if search_stats.enabled:
+            search_stats.constraint_checks += 1
+
+        for i in range(config.grid_size):
+            if not _is_line_valid(
+                self._row_sun[i], self._row_moon[i],
+                self._row_sun_count[i], self._row_moon_count[i],
+                self._row_equal[i], self._row_times[i]
+            ):
+                return False
+
+        for j in range(config.grid_size):
+            if not _is_line_valid(
+                self._col_sun[j], self._col_moon[j],
+                self._col_sun_count[j], self._col_moon_count[j],
+                self._col_equal[j], self._col_times[j]
+            ):
+                return False
+
+        return True
+
+    def is_valid_after(self, posn: Posn) -> bool:
+        if search_stats.enabled:
+            search_stats.constraint_checks += 1
+
+        # only the row and column of posn can have been affected
+        i, j = posn
+
+        return _is_line_valid(
+            self._row_sun[i], self._row_moon[i],
+            self._row_sun_count[i], self._row_moon_count[i],
+            self._row_equal[i], self._row_times[i]
+        ) and _is_line_valid(
+            self._col_sun[j], self._col_moon[j],
+            self._col_sun_count[j], self._col_moon_count[j],
+            self._col_equal[j], self._col_times[j]
+        )
+
+    def is_solved(self) -> bool:
+        # every row and column must have exactly (size / 2) of each symbol
+        for k in range(config.grid_size):
+            if (
+                self._row_sun_count[k] * 2 != config.grid_size
+                or self._row_moon_count[k] * 2 != config.grid_size
+                or self._col_sun_count[k] * 2 != config.grid_size
+                or self._col_moon_count[k] * 2 != config.grid_size
+            ):
+                return False
+
+        return self.is_valid()
+
+    def clear_board(self):
+        super().clear_board()
+        self._reset_symbol_masks()
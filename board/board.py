@@ -1,7 +1,10 @@
+import base64
 from collections import defaultdict
+from typing import Sequence
 
+from board.search_stats import search_stats
 from game.game_config import config
-from utils import (add_posns, direction_to_posn, is_posn_in_bounds,
+from utils import (add_posns, direction_to_posn, get_edges, is_posn_in_bounds,
                      posns_to_direction)
 from tango_types import DIRECTION, SIGN, SYMBOL, Posn
 
@@ -78,6 +81,9 @@ class Board:
         4. Tiles connected with a "x" have different symbols
         5. No 3 consecutive tiles in a row/column have the same symbol
         """
+        if search_stats.enabled:
+            search_stats.constraint_checks += 1
+
         # check condition 1
         for i in range(config.grid_size):
             counter = [0 for _ in range(len(SYMBOL))]
@@ -135,6 +141,55 @@ class Board:
                         
         return True
 
+    def is_valid_after(self, posn: Posn) -> bool:
+        """
+        Checks only the conditions of is_valid() that involve the tile at posn: its row, its
+        column, the windows of 3 consecutive tiles containing it and the signs touching it.
+
+        If the board was valid before the tile at posn was set, this is equivalent to is_valid().
+        """
+        if search_stats.enabled:
+            search_stats.constraint_checks += 1
+
+        i, j = posn
+        row = self._board[i]
+        col = [self._board[k][j] for k in range(config.grid_size)]
+
+        # check row/column counts
+        for line in (row, col):
+            if line.count(SYMBOL.SUN.value) > config.grid_size / 2 or line.count(SYMBOL.MOON.value) > config.grid_size / 2:
+                return False
+
+        # check windows of 3 consecutive tiles that contain posn
+        for line, k in ((row, j), (col, i)):
+            for start in range(max(0, k - 2), min(k, config.grid_size - 3) + 1):
+                if line[start] <= SYMBOL.MOON.value and line[start] == line[start + 1] and line[start] == line[start + 2]:
+                    return False
+
+        # check signs going out of posn and into posn
+        touching_signs = [(posn, dir, sign) for dir, sign in self._signs.get(posn, ())]
+        for from_posn, into_dir in (((i, j - 1), DIRECTION.RIGHT), ((i - 1, j), DIRECTION.DOWN)):
+            for dir, sign in self._signs.get(from_posn, ()):
+                if dir == into_dir:
+                    touching_signs.append((from_posn, dir, sign))
+
+        for from_posn, dir, sign in touching_signs:
+            from_symbol = self.get_symbol_at_posn(from_posn)
+            to_symbol = self.get_symbol_at_posn(add_posns(from_posn, direction_to_posn(dir)))
+
+            if from_symbol.value > SYMBOL.MOON.value or to_symbol.value > SYMBOL.MOON.value:
+                continue
+
+            match sign:
+                case SIGN.EQUAL:
+                    if from_symbol != to_symbol:
+                        return False
+                case SIGN.TIMES:
+                    if from_symbol == to_symbol:
+                        return False
+
+        return True
+
     def is_solved(self) -> bool:
         """
         Board is solved if all conditions apply:
@@ -189,24 +244,79 @@ class Board:
     
     def clear_board(self):
         self._board = [[SYMBOL.NONE.value for i in range(config.grid_size)] for j in range(config.grid_size)]
+
+    def get_symbol_values(self) -> tuple[int, ...]:
+        """
+        Returns the value of every tile's symbol, row-major.
+        """
+        return tuple(
+            self.get_symbol_at_posn((i, j)).value for i in range(config.grid_size) for j in range(config.grid_size)
+        )
+
+    def set_symbol_values(self, values: Sequence[int]) -> None:
+        """
+        Sets every tile's symbol from values as returned by get_symbol_values.
+        """
+        for idx, value in enumerate(values):
+            self.set_symbol_at_posn(divmod(idx, config.grid_size), SYMBOL(value))
     
-    def __repr__(self):
-        string = "board = Board()\n"
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the board as one byte for the grid size followed by a little-endian bit-packed
+        integer with:
+
+        1. 3 bits per tile holding the symbol's value, row-major
+        2. 2 bits per edge for the signs (0 = none, 1 = "=", 2 = "x"), in the order of get_edges
+        """
+        value = 0
+        offset = 0
+
         for i in range(config.grid_size):
             for j in range(config.grid_size):
-                string += (
-                    f"board.set_symbol_at_posn(({i}, {j}), {SYMBOL(self._board[i][j])})\n"
-                )
+                value |= self._board[i][j] << offset
+                offset += 3
 
-        for from_posn, sign_set in self._signs.items():
-            for dir, sign in sign_set:
-                dir_posn = direction_to_posn(dir)
-                to_posn = add_posns(from_posn, dir_posn)
-                string += (
-                    f"board.set_symbol_at_posn({from_posn}, {to_posn}, {sign})\n"
-                )
+        for from_posn, dir in get_edges(config.grid_size):
+            for sign_dir, sign in self._signs.get(from_posn, ()):
+                if sign_dir == dir:
+                    value |= (sign.value + 1) << offset
+                    break
+            offset += 2
+
+        return bytes([config.grid_size]) + value.to_bytes((offset + 7) // 8, "little")
 
-        return string
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        if data[0] != config.grid_size:
+            raise ValueError(f"Can't load a {data[0]}x{data[0]} board on a {config.grid_size}x{config.grid_size} grid")
+
+        value = int.from_bytes(data[1:], "little")
+        board = cls()
+
+        for i in range(config.grid_size):
+            for j in range(config.grid_size):
+                symbol = SYMBOL(value & 0b111)
+                if symbol != SYMBOL.NONE:
+                    board.set_symbol_at_posn((i, j), symbol)
+                value >>= 3
+
+        for from_posn, dir in get_edges(config.grid_size):
+            sign_value = value & 0b11
+            if sign_value:
+                board.set_sign(from_posn, add_posns(from_posn, direction_to_posn(dir)), SIGN(sign_value - 1))
+            value >>= 2
+
+        return board
+
+    def to_text(self) -> str:
+        return base64.urlsafe_b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_text(cls, text: str):
+        return cls.from_bytes(base64.urlsafe_b64decode(text))
+
+    def __repr__(self):
+        return f"{type(self).__name__}.from_text({self.to_text()!r})"
     
     def print_board(self) -> None:
         board_str = ""
@@ -252,7 +362,7 @@ class Board:
         print(board_str)
 
     def copy(self):
-        board = Board()
+        board = type(self)()
 
         for i in range(config.grid_size):
             for j in range(config.grid_size):
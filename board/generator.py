@@ -1,40 +1,31 @@
 import random
+from typing import Callable, TypeVar
+
 from board.board import Board
-from board.solver import Solver
+from board.grid_sampler import GridSampler
+from board.intuitive_deducer import Deduction, IntuitiveDeducer
+from board.search_stats import SearchStats, search_stats
+from board.solver_backends import AutoSolver
 from game.game_config import config
-from utils import add_posns, direction_to_posn, generate_random_posn, generate_random_symbol
+from utils import add_posns, direction_to_posn, generate_random_posn, get_edges
 from tango_types import SIGN, SYMBOL, DIRECTION, Posn
 
+T = TypeVar("T")
 
-class Generator:
-    @staticmethod
-    def _generate_board_symbols(board: Board, depth: int) -> bool:
-        if depth >= (config.grid_size ** 2):
-            return board.is_solved()
-        
-        current_posn = (depth // config.grid_size, depth % config.grid_size)
-        
-        choices = [SYMBOL.SUN, SYMBOL.MOON]
-        random.shuffle(choices)
-        for symbol in choices:
-            board.set_symbol_at_posn(current_posn, symbol)
-
-            if board.is_valid() and Generator._generate_board_symbols(board, depth + 1):
-                return True
-            
 
-        board.set_symbol_at_posn(current_posn, SYMBOL.NONE)
-        return False
+class Generator:
+    # solver used to solve generated boards and check their uniqueness, any SolverBackend (see
+    # solver_backends) can be swapped in
+    solver = AutoSolver
 
     @staticmethod
-    def generate_board_symbols() -> Board:
-        board = Board()
-        while not Generator._generate_board_symbols(board, 0):
-            print("FAILED TO GENERATE BOARD")
-            board = Board()
-        
-        return board
-    
+    def generate_board_symbols(uniform: bool = False) -> Board:
+        """
+        Returns a random solved board, drawn row by row from the legal lines (see GridSampler).
+        With `uniform`, every solved board is about as likely to come out.
+        """
+        return GridSampler.sample_board(uniform)
+
     @staticmethod
     def populate_signs(board: Board):
         # populate going row-wise
@@ -80,99 +71,216 @@ class Generator:
 
     
     @staticmethod
-    def reduce_signs(board: Board) -> None:
-        num_signs = 2 * (config.grid_size - 1) * config.grid_size
+    def _get_sign_redundancy(signs: dict[tuple[Posn, DIRECTION], SIGN]) -> dict[tuple[Posn, DIRECTION], int]:
+        """
+        Scores how many ways each sign is implied by the signs around it, as a cheap guess of how
+        likely it is to be removable:
+
+        1. A "x" next to a "=" in the same row/column is implied by the pair rule
+        2. Going around a 2x2 square flips the symbol an even number of times, so any 3 signs of a
+        square imply the 4th
+        """
+        redundancy = {}
+        for (posn, dir), sign in signs.items():
+            step = direction_to_posn(dir)
+            score = 0
+
+            if sign == SIGN.TIMES:
+                for neighbor_posn in (add_posns(posn, (-step[0], -step[1])), add_posns(posn, step)):
+                    if signs.get((neighbor_posn, dir)) == SIGN.EQUAL:
+                        score += 1
+
+            # top-left corners of the squares the sign is a side of
+            i, j = posn
+            corners = [(i, j), (i - 1, j)] if dir == DIRECTION.RIGHT else [(i, j), (i, j - 1)]
+            for corner_i, corner_j in corners:
+                square = [
+                    ((corner_i, corner_j), DIRECTION.RIGHT),
+                    ((corner_i + 1, corner_j), DIRECTION.RIGHT),
+                    ((corner_i, corner_j), DIRECTION.DOWN),
+                    ((corner_i, corner_j + 1), DIRECTION.DOWN),
+                ]
+                if all(edge in signs for edge in square):
+                    score += 1
+
+            redundancy[(posn, dir)] = score
+
+        return redundancy
+
+    @staticmethod
+    def _remove_sign_group(
+        board: Board,
+        solution: Board,
+        group: list[tuple[Posn, DIRECTION, SIGN]],
+        known_necessary: bool = False,
+    ) -> bool:
+        """
+        Removes as many signs of the group as possible while keeping `solution` as the only
+        solution, by removing the whole group at once and bisecting it if that fails. With
+        `known_necessary` the whole group is already known to not be removable.
+
+        Returns whether every sign of the group was removed.
+        """
+        if not known_necessary:
+            for from_posn, dir, _ in group:
+                board.remove_sign(from_posn, dir)
+
+            if not Generator.solver.has_other_solution(board, solution):
+                return True
+
+            # add signs back
+            for from_posn, dir, sign in group:
+                board.set_sign(from_posn, add_posns(from_posn, direction_to_posn(dir)), sign)
+
+        if len(group) == 1:
+            return False
+
+        half = len(group) // 2
+        first_removed = Generator._remove_sign_group(board, solution, group[:half])
+
+        # if the first half could be removed, the rest of the group is what keeps it from being
+        # removable
+        Generator._remove_sign_group(board, solution, group[half:], known_necessary=first_removed)
+
+        return False
+
+    @staticmethod
+    def reduce_signs(board: Board, solution: Board | None = None) -> None:
+        """
+        Removes signs as long as the board keeps `solution` as its only solution. The solution is
+        found with the solver if it isn't given.
 
+        Removing a sign can only add solutions, so a sign that can't be removed now can't be
+        removed after other signs are gone either. Every sign is therefore only tried once, which
+        is done in groups:
+
+        1. Signs are shuffled, then ordered by how redundant they look (see _get_sign_redundancy)
+        2. Each group is removed at once, and bisected if the solution stops being unique
+        3. The group size doubles after a group is removed completely and halves otherwise
+
+        Removing a group at once keeps the solution unique exactly when removing its signs one by
+        one would, so the signs left are the same as trying every sign on its own in this order.
+        """
+        if solution is None:
+            solution = board.copy()
+            if not Generator.solver.solve(solution):
+                raise ValueError("Input board must be solvable")
+
+        # go through the edges in a fixed order so a seeded run always removes the same signs
+        # (iterating the sign sets depends on the hashes of the enums)
         board_signs = board.get_all_signs()
         remaining_signs = []
-        for from_posn, sign_set in board_signs.items():
-            for dir, sign in sign_set:
-                remaining_signs.append((from_posn, dir, sign))
+        for from_posn, edge_dir in get_edges(config.grid_size):
+            for dir, sign in board_signs.get(from_posn, ()):
+                if dir == edge_dir:
+                    remaining_signs.append((from_posn, dir, sign))
 
-        while num_signs >= 0:
-            random.shuffle(remaining_signs)
-            
-            to_remove = None
-            for from_posn, dir, sign in remaining_signs:
-                board.remove_sign(from_posn, dir)
+        random.shuffle(remaining_signs)
 
-                num_solutions = Solver.get_num_solutions(board)
-                if num_solutions == 1:
-                    to_remove = (from_posn, dir, sign)
-                    break
+        redundancy = Generator._get_sign_redundancy(
+            {(from_posn, dir): sign for from_posn, dir, sign in remaining_signs}
+        )
+        remaining_signs.sort(key=lambda s: redundancy[(s[0], s[1])], reverse=True)
 
-                # add sign back
-                dir_posn = direction_to_posn(dir)
-                to_posn = add_posns(from_posn, dir_posn)
-                board.set_sign(from_posn, to_posn, sign)
+        group_size = 1
+        start = 0
+        while start < len(remaining_signs):
+            group = remaining_signs[start:start + group_size]
+            start += len(group)
 
-            if to_remove:
-                remaining_signs.remove((from_posn, dir, sign))
-                num_signs -= 1
+            if Generator._remove_sign_group(board, solution, group):
+                group_size *= 2
             else:
-                return
+                group_size = max(1, group_size // 2)
             
     @staticmethod
-    def populate_symbols(board: Board) -> None:
-        if Solver.is_intuitively_solvable(board):
+    def populate_symbols(board: Board, solution: Board | None = None) -> None:
+        """
+        Fills the board with its solution, then removes as many symbols as possible in a random
+        order while it stays intuitively solvable (see Solver.is_intuitively_solvable). The
+        solution is found with the solver if it isn't given.
+
+        Removing a symbol can only take deductions away, so a symbol that can't be removed now
+        can't be removed after other symbols are gone either and every symbol is only tried once.
+        IntuitiveDeducer keeps the deductions between tries, so a try only deduces the tiles that
+        depended on the removed symbol again.
+        """
+        if Generator.solver.is_intuitively_solvable(board):
             return
         
-        # solution = board.copy()
-        if not Solver.solve(board):
-            raise ValueError("Input board must be solvable")
-        
         posns = [(i, j) for i in range(config.grid_size) for j in range(config.grid_size)]
-        random.shuffle(posns)
-        posns = set(posns)
-        
-        for _ in range(config.grid_size ** 2):
-            removed_posn = None
 
+        if solution is None:
+            if not Generator.solver.solve(board):
+                raise ValueError("Input board must be solvable")
+        else:
             for posn in posns:
-                symbol = board.get_symbol_at_posn(posn)
-                if symbol == SYMBOL.NONE:
-                    continue
+                board.set_symbol_at_posn(posn, solution.get_symbol_at_posn(posn))
 
-                board.set_symbol_at_posn(posn, SYMBOL.NONE)
-                if Solver.is_intuitively_solvable(board):
-                    removed_posn = posn
-                    break
+        random.shuffle(posns)
 
-                board.set_symbol_at_posn(posn, symbol)
+        deducer = IntuitiveDeducer(board)
+        for posn in posns:
+            deducer.remove_clue(posn)
 
-            if removed_posn:
-                posns.remove(removed_posn)
-            else:
-                return
-        
-        # empty_posns = []
-        # for i in range(config.grid_size):
-        #     for j in range(config.grid_size):
-        #         if board.get_symbol_at_posn((i, j)) == SYMBOL.NONE:
-        #             empty_posns.append((i, j))
+    @staticmethod
+    def generate_with_trace() -> tuple[Board, list[Deduction]]:
+        """
+        Generates a board like generate(), also returning the deductions that solve it in order
+        (see IntuitiveDeducer.get_deductions), which are recorded while checking that the board
+        is intuitively solvable.
+        """
+        with search_stats.phase("generate_board_symbols"):
+            board = Generator.generate_board_symbols()
 
-        # random.shuffle(empty_posns)
+        with search_stats.phase("populate_signs"):
+            Generator.populate_signs(board)
 
-        # for i in range(len(empty_posns)):
-        #     board.set_symbol_at_posn(empty_posns[i], solution.get_symbol_at_posn(empty_posns[i]))
-            
-        #     if Solver.is_intuitively_solvable(board):
-        #         return
-            
-        raise ValueError("Something went very wrong")
+        solution = board.copy()
+        board.clear_board()
+
+        # the board with all signs only has a solution up to swapping suns and moons, pick the one
+        # matching the generated symbols
+        posn = generate_random_posn()
+        board.set_symbol_at_posn(posn, solution.get_symbol_at_posn(posn))
+
+        with search_stats.phase("reduce_signs"):
+            Generator.reduce_signs(board, solution)
+
+        with search_stats.phase("populate_symbols"):
+            Generator.populate_symbols(board, solution)
+
+        deducer = IntuitiveDeducer(board)
+        assert deducer.is_solvable()
+
+        return board, deducer.get_deductions()
 
     @staticmethod
     def generate() -> Board:
-        board = Generator.generate_board_symbols()
-        Generator.populate_signs(board)
+        board, _ = Generator.generate_with_trace()
+        return board
 
-        board.clear_board()
-        board.set_symbol_at_posn(generate_random_posn(), generate_random_symbol())
+    @staticmethod
+    def run_with_stats(generate: Callable[[], T]) -> tuple[T, SearchStats]:
+        """
+        Runs one of the generate functions, also returning the time spent in every phase and the
+        search counters accumulated while generating.
+        """
+        was_enabled = search_stats.enabled
+        search_stats.enabled = True
+        search_stats.reset()
 
-        Generator.reduce_signs(board)
-        Generator.populate_symbols(board)   
+        try:
+            result = generate()
+        finally:
+            search_stats.enabled = was_enabled
 
-        board.print_board()
-        assert Solver.is_intuitively_solvable(board)
+        return result, search_stats.snapshot()
 
-        return board
\ No newline at end of file
+    @staticmethod
+    def generate_with_stats() -> tuple[Board, SearchStats]:
+        """
+        Generates a board like generate(), also returning the time spent in every phase and the
+        search counters accumulated while generating it.
+        """
+        return Generator.run_with_stats(Generator.generate)
\ No newline at end of file
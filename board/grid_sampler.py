@@ -0,0 +1,227 @@
+import random
+from functools import lru_cache
+
+from board.bitboard import BitBoard
+from board.board import Board
+from board.line_table import get_full_mask, get_valid_lines
+from board.search_stats import search_stats
+from game.game_config import config
+from tango_types import SYMBOL
+
+
+@lru_cache(maxsize=None)
+def count_column_completions(grid_size: int, suns: int, moons: int, last: int, run: int) -> int:
+    """
+    Returns the number of ways to fill the rest of a column that already has `suns` suns and
+    `moons` moons and ends in `run` tiles of `last` (1 = sun, 0 = moon), without more than
+    (size / 2) of each symbol or 3 consecutive tiles with the same symbol. Columns that already
+    break one of these have no completions.
+    """
+    half = grid_size // 2
+    if suns > half or moons > half or run > 2:
+        return 0
+
+    if suns + moons == grid_size:
+        return 1
+
+    return (
+        count_column_completions(grid_size, suns + 1, moons, 1, run + 1 if last == 1 else 1)
+        + count_column_completions(grid_size, suns, moons + 1, 0, run + 1 if last == 0 else 1)
+    )
+
+
+class GridSampler:
+    """
+    Draws random solved grids one row at a time from the table of legal lines (see line_table).
+
+    Every column keeps track of its counts and of the run of equal tiles it ends in, which is all
+    it takes to know how many ways the column alone can still be completed
+    (count_column_completions). Before picking a row, each column is checked for whether it can
+    still be completed after a sun and after a moon, which gives masks of the columns that can't
+    take a sun/moon and rules out every row that would leave a column impossible to complete.
+
+    A row is then picked either:
+
+    1. Uniformly among the remaining rows, or
+    2. With probability proportional to the product of the number of completions of every column
+    after it (`uniform=True`). This approximates the number of grids the row leads to, where the
+    first mode favors grids whose first rows have few continuations.
+
+    The approximation still ignores how columns constrain each other, so in the uniform mode the
+    grid is then mixed with MIXING_STEPS_PER_TILE random switches per tile (see _mix), which
+    brings it close to uniformly distributed over all grids.
+
+    The last row is forced by the column counts, so the row before it also has to leave a legal
+    line for it. Lookahead leaves rows that conflict through the rows below them as the only dead
+    ends, which are rare and are handled by trying another row one level up instead of starting
+    over.
+    """
+
+    MIXING_STEPS_PER_TILE = 4
+
+    def __init__(self, grid_size: int):
+        self.size = grid_size
+        self.lines = get_valid_lines(grid_size)
+        self.line_set = set(self.lines)
+
+        self.rows: list[int] = []
+
+        # per column: number of suns, number of moons, symbol of the last run and its length
+        self.columns: list[tuple[int, int, int, int]] = [(0, 0, -1, 0)] * grid_size
+
+    def _get_next_column(self, column: tuple[int, int, int, int], symbol: int) -> tuple[int, int, int, int]:
+        suns, moons, last, run = column
+        return (
+            suns + symbol,
+            moons + 1 - symbol,
+            symbol,
+            run + 1 if symbol == last else 1,
+        )
+
+    def _get_candidates(self, uniform: bool) -> tuple[list[int], list[int] | None]:
+        """
+        Returns the rows that keep every column completable and, if `uniform`, their weights.
+        """
+        forbidden = 0
+        required = 0
+
+        # number of completions of every column after a moon/sun
+        completions = []
+        for j, column in enumerate(self.columns):
+            moon_completions = count_column_completions(self.size, *self._get_next_column(column, 0))
+            sun_completions = count_column_completions(self.size, *self._get_next_column(column, 1))
+
+            if not sun_completions:
+                forbidden |= 1 << j
+            if not moon_completions:
+                required |= 1 << j
+
+            completions.append((moon_completions, sun_completions))
+
+        if forbidden & required:
+            return [], None
+
+        candidates = [sun for sun in self.lines if not sun & forbidden and sun & required == required]
+
+        if len(self.rows) == self.size - 2:
+            # the column counts force the last row, which has to be a legal line as well
+            half = self.size // 2
+            one_left = 0
+            two_left = 0
+            for j, (suns, _, _, _) in enumerate(self.columns):
+                if suns == half - 1:
+                    one_left |= 1 << j
+                elif suns == half - 2:
+                    two_left |= 1 << j
+
+            candidates = [sun for sun in candidates if two_left | (one_left & ~sun) in self.line_set]
+
+        if not uniform:
+            return candidates, None
+
+        weights = []
+        for sun in candidates:
+            weight = 1
+            for j in range(self.size):
+                weight *= completions[j][sun >> j & 1]
+            weights.append(weight)
+
+        return candidates, weights
+
+    def _push(self, sun: int) -> None:
+        self.rows.append(sun)
+        self.columns = [self._get_next_column(column, sun >> j & 1) for j, column in enumerate(self.columns)]
+
+    def _is_line_valid(self, sun: int) -> bool:
+        moon = get_full_mask(self.size) ^ sun
+        return not (sun & (sun >> 1) & (sun >> 2) or moon & (moon >> 1) & (moon >> 2))
+
+    def _mix(self, num_steps: int) -> None:
+        """
+        Applies random switches to the grid: pick 2 rows and 2 columns whose 4 tiles alternate
+        (e.g. sun moon / moon sun) and flip all of them, keeping the switch if no 3 consecutive
+        tiles end up the same. Flipping an alternating rectangle keeps every count balanced, and
+        each switch is as likely as the one undoing it, so mixing doesn't favor any grid.
+        """
+        columns = [sum((sun >> j & 1) << i for i, sun in enumerate(self.rows)) for j in range(self.size)]
+
+        for _ in range(num_steps):
+            i_1, i_2 = random.sample(range(self.size), 2)
+            j_1, j_2 = random.sample(range(self.size), 2)
+
+            row_1 = self.rows[i_1]
+            row_2 = self.rows[i_2]
+            corner = row_1 >> j_1 & 1
+            if row_1 >> j_2 & 1 == corner or row_2 >> j_1 & 1 == corner or row_2 >> j_2 & 1 != corner:
+                continue
+
+            row_mask = (1 << j_1) | (1 << j_2)
+            column_mask = (1 << i_1) | (1 << i_2)
+            flipped = (row_1 ^ row_mask, row_2 ^ row_mask, columns[j_1] ^ column_mask, columns[j_2] ^ column_mask)
+
+            if all(self._is_line_valid(line) for line in flipped):
+                self.rows[i_1], self.rows[i_2], columns[j_1], columns[j_2] = flipped
+
+    def sample(self, uniform: bool = False) -> list[int]:
+        """
+        Returns the sun masks of the rows of a random solved grid.
+        """
+        # stack of (rows left to try, their weights, columns before the row) for every placed row
+        stack = []
+        candidates, weights = self._get_candidates(uniform)
+        num_dead_ends = 0
+
+        # backtracking only ever gets back to the first rows, there's nothing to try without them
+        if not candidates:
+            raise ValueError(f"There are no solved {self.size}x{self.size} grids")
+
+        while len(self.rows) < self.size:
+            if not candidates:
+                # dead end, try another row in place of the last one, or further up once dead ends
+                # keep coming since the row that caused them is usually a few levels up
+                if search_stats.enabled:
+                    search_stats.backtracks += 1
+
+                num_dead_ends += 1
+                for _ in range(min(len(self.rows), 1 + num_dead_ends // self.size)):
+                    self.rows.pop()
+                    candidates, weights, self.columns = stack.pop()
+
+                # every first row has been skipped over, they're all worth trying again
+                if not self.rows and not candidates:
+                    candidates, weights = self._get_candidates(uniform)
+                continue
+
+            if search_stats.enabled:
+                search_stats.nodes += 1
+
+            if weights is None:
+                index = random.randrange(len(candidates))
+            else:
+                index = random.choices(range(len(candidates)), weights)[0]
+
+            sun = candidates[index]
+            rest = candidates[:index] + candidates[index + 1:]
+            rest_weights = None if weights is None else weights[:index] + weights[index + 1:]
+            stack.append((rest, rest_weights, self.columns))
+
+            self._push(sun)
+            if len(self.rows) < self.size:
+                candidates, weights = self._get_candidates(uniform)
+
+        if uniform:
+            self._mix(GridSampler.MIXING_STEPS_PER_TILE * self.size ** 2)
+
+        return self.rows
+
+    @staticmethod
+    def sample_board(uniform: bool = False) -> Board:
+        """
+        Returns a random solved board of the current grid size.
+        """
+        board = BitBoard()
+        for i, sun in enumerate(GridSampler(config.grid_size).sample(uniform)):
+            for j in range(config.grid_size):
+                board.set_symbol_at_posn((i, j), SYMBOL.SUN if sun >> j & 1 else SYMBOL.MOON)
+
+        return board
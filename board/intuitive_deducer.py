@@ -0,0 +1,268 @@
+from collections import defaultdict
+
+from board.board import Board
+from board.propagation_solver import EMPTY, _get_layout
+from board.search_stats import search_stats
+from game.game_config import config
+from tango_types import RULE, SIGN, SYMBOL, Posn
+from utils import add_posns, direction_to_posn
+
+Deduction = tuple[Posn, SYMBOL, RULE]
+
+
+class IntuitiveDeducer:
+    """
+    Deduces every symbol of a board that can be placed "intuitively" (see
+    Solver.is_intuitively_solvable), i.e. every tile where one of the symbols would break a rule
+    given the tiles filled so far. Cells are indexed as (i * grid_size + j) and hold EMPTY,
+    SYMBOL.SUN.value or SYMBOL.MOON.value like in the propagation solver, guesses count as empty.
+
+    Placing a symbol v can only force other tiles through one of these rules:
+
+    1. Saturation: its row/column now has (size / 2) v's, so the other tiles get the complement
+    2. Pair: a tile next to it is also v, so the tiles on both ends of the pair get the complement
+    3. Sandwich: the tile two away from it is also v, so the tile between them gets the complement
+    4. Sign: a tile connected to it by a "=" gets v and a tile connected by a "x" gets the
+    complement, which follows chains of signs as the forced tiles are placed in turn
+
+    so deductions run from a worklist of the tiles placed last instead of trying both symbols on
+    every empty tile.
+
+    Every deduced tile is recorded along with the tiles that forced it (its support). A deduction
+    stays valid as long as its support is filled, so removing a clue (see remove_clue) only undoes
+    the deductions that depended on it, directly or through other deductions, and only those tiles
+    have to be deduced again. Since deductions never need fewer filled tiles, the tiles that end
+    up deduced don't depend on the order they are deduced in.
+    """
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.size = config.grid_size
+        self.half = config.grid_size // 2
+        self.rows, self.cols, self.windows = _get_layout(config.grid_size)
+
+        self.cells = [EMPTY] * (self.size ** 2)
+        self.row_counts = [[0, 0, 0] for _ in range(self.size)]
+        self.col_counts = [[0, 0, 0] for _ in range(self.size)]
+        self.queue: list[int] = []
+
+        # whether the clues and deductions broke a rule
+        self.is_contradiction = False
+
+        # for every cell, the cells it is connected to with a sign
+        self.links: list[list[tuple[int, SIGN]]] = [[] for _ in range(self.size ** 2)]
+        for from_posn, sign_set in board.get_all_signs().items():
+            for dir, sign in sign_set:
+                to_posn = add_posns(from_posn, direction_to_posn(dir))
+                from_idx = from_posn[0] * self.size + from_posn[1]
+                to_idx = to_posn[0] * self.size + to_posn[1]
+
+                self.links[from_idx].append((to_idx, sign))
+                self.links[to_idx].append((from_idx, sign))
+
+        # mapping of deduced cell => (rule, cells it was deduced from), in the order of deduction
+        self.supports: dict[int, tuple[RULE, list[int]]] = {}
+
+        # mapping of cell => deduced cells whose support contains it
+        self.dependents: dict[int, set[int]] = defaultdict(set)
+
+        for i in range(self.size):
+            for j in range(self.size):
+                symbol = board.get_symbol_at_posn((i, j))
+                if symbol in (SYMBOL.SUN, SYMBOL.MOON) and not self._place(i * self.size + j, symbol.value):
+                    self.is_contradiction = True
+
+        if not self.is_contradiction:
+            self.is_contradiction = not self._propagate([])
+
+    def _set(self, idx: int, value: int) -> None:
+        i, j = divmod(idx, self.size)
+        self.cells[idx] = value
+        self.row_counts[i][value] += 1
+        self.col_counts[j][value] += 1
+
+    def _place(self, idx: int, value: int) -> bool:
+        current = self.cells[idx]
+        if current != EMPTY:
+            return current == value
+
+        self._set(idx, value)
+        self.queue.append(idx)
+
+        i, j = divmod(idx, self.size)
+        return self.row_counts[i][value] <= self.half and self.col_counts[j][value] <= self.half
+
+    def _clear(self, idx: int) -> None:
+        i, j = divmod(idx, self.size)
+        value = self.cells[idx]
+        self.cells[idx] = EMPTY
+        self.row_counts[i][value] -= 1
+        self.col_counts[j][value] -= 1
+
+    def _deduce(self, idx: int, value: int, rule: RULE, support: list[int], deduced: list[int]) -> bool:
+        """
+        Places a forced symbol, returning False if the tile already holds the complement.
+        """
+        if self.cells[idx] != EMPTY:
+            return self.cells[idx] == value
+
+        self._remember(idx, rule, support)
+        deduced.append(idx)
+
+        return self._place(idx, value)
+
+    def _remember(self, idx: int, rule: RULE, support: list[int]) -> None:
+        self.supports[idx] = (rule, support)
+        for k in support:
+            self.dependents[k].add(idx)
+
+    def _forget(self, idx: int) -> None:
+        _, support = self.supports.pop(idx)
+        for k in support:
+            self.dependents[k].discard(idx)
+
+    def _get_window_rule(self, idx: int, a: int, b: int) -> RULE:
+        # b is forced by idx and a, it's sandwiched if it's the middle tile of the window
+        return RULE.SANDWICH if min(idx, a) < b < max(idx, a) else RULE.PAIR
+
+    def _propagate(self, deduced: list[int]) -> bool:
+        """
+        Applies the rules to every placed tile in the queue until nothing changes, appending the
+        deduced cells to `deduced`. Returns False (with the queue cleared) as soon as a rule is
+        broken.
+        """
+        while self.queue:
+            idx = self.queue.pop()
+            if search_stats.enabled:
+                search_stats.constraint_checks += 1
+
+            value = self.cells[idx]
+            other = 3 - value
+            i, j = divmod(idx, self.size)
+
+            for line, counts in ((self.rows[i], self.row_counts[i]), (self.cols[j], self.col_counts[j])):
+                if counts[value] == self.half:
+                    support = [k for k in line if self.cells[k] == value]
+                    for k in line:
+                        if self.cells[k] == EMPTY and not self._deduce(k, other, RULE.SATURATION, support, deduced):
+                            self.queue.clear()
+                            return False
+
+            for a, b in self.windows[idx]:
+                a_value = self.cells[a]
+                b_value = self.cells[b]
+
+                if a_value == value and b_value == value:
+                    self.queue.clear()
+                    return False
+                elif a_value == value and b_value == EMPTY:
+                    forced = self._deduce(b, other, self._get_window_rule(idx, a, b), [idx, a], deduced)
+                elif b_value == value and a_value == EMPTY:
+                    forced = self._deduce(a, other, self._get_window_rule(idx, b, a), [idx, b], deduced)
+                else:
+                    continue
+
+                if not forced:
+                    self.queue.clear()
+                    return False
+
+            for linked_idx, sign in self.links[idx]:
+                if not self._deduce(linked_idx, value if sign == SIGN.EQUAL else other, RULE.SIGN, [idx], deduced):
+                    self.queue.clear()
+                    return False
+
+        return True
+
+    def _get_reason(self, idx: int, value: int) -> tuple[RULE, list[int]] | None:
+        """
+        Returns the rule and filled cells that make placing `value` at the empty cell idx invalid,
+        or None if it can be placed.
+        """
+        i, j = divmod(idx, self.size)
+
+        for line, counts in ((self.rows[i], self.row_counts[i]), (self.cols[j], self.col_counts[j])):
+            if counts[value] == self.half:
+                return RULE.SATURATION, [k for k in line if self.cells[k] == value]
+
+        for a, b in self.windows[idx]:
+            if self.cells[a] == value and self.cells[b] == value:
+                return self._get_window_rule(a, b, idx), [a, b]
+
+        for linked_idx, sign in self.links[idx]:
+            linked_value = self.cells[linked_idx]
+            if linked_value != EMPTY and (linked_value == value) != (sign == SIGN.EQUAL):
+                return RULE.SIGN, [linked_idx]
+
+        return None
+
+    def is_solvable(self) -> bool:
+        return not self.is_contradiction and EMPTY not in self.cells
+
+    def get_deductions(self) -> list[Deduction]:
+        """
+        Returns every deduced (posn, symbol, rule), in an order where each tile only relies on
+        clues and the tiles before it.
+        """
+        return [
+            (divmod(idx, self.size), SYMBOL(self.cells[idx]), rule)
+            for idx, (rule, _) in self.supports.items()
+        ]
+
+    def remove_clue(self, posn: Posn) -> bool:
+        """
+        Removes the symbol at posn from the board if the board stays intuitively solvable without
+        it. Returns whether the symbol was removed.
+        """
+        if search_stats.enabled:
+            search_stats.intuitive_checks += 1
+
+        idx = posn[0] * self.size + posn[1]
+
+        # the clue and every deduction that depended on it
+        affected = [idx]
+        seen = {idx}
+        for k in affected:
+            for dependent in self.dependents[k]:
+                if dependent not in seen:
+                    seen.add(dependent)
+                    affected.append(dependent)
+
+        previous_supports = dict(self.supports)
+        saved = [(k, self.cells[k]) for k in affected]
+        for k in affected:
+            if k in self.supports:
+                self._forget(k)
+            self._clear(k)
+
+        # the tiles left filled can only force the cleared tiles directly, everything else
+        # follows from the tiles deduced again
+        deduced = []
+        is_consistent = True
+        for k in affected:
+            if self.cells[k] != EMPTY:
+                continue
+
+            for value in (SYMBOL.SUN.value, SYMBOL.MOON.value):
+                reason = self._get_reason(k, value)
+                if reason is not None:
+                    is_consistent = self._deduce(k, 3 - value, *reason, deduced) and is_consistent
+                    break
+
+        if is_consistent and self._propagate(deduced) and EMPTY not in self.cells:
+            self.board.set_symbol_at_posn(posn, SYMBOL.NONE)
+            return True
+
+        # put back the clue and the previous deductions, keeping their order
+        self.queue.clear()
+        for k in deduced:
+            self._forget(k)
+            self._clear(k)
+
+        for k, value in saved:
+            self._set(k, value)
+            if k in previous_supports:
+                self._remember(k, *previous_supports[k])
+
+        self.supports = previous_supports
+
+        return False
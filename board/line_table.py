@@ -0,0 +1,124 @@
+from functools import lru_cache
+
+from board.board import Board
+from game.game_config import config
+from tango_types import DIRECTION, SIGN, SYMBOL
+
+# Lines (rows or columns) are represented by the bitmask of their suns, where bit k is the k-th
+# tile of the line. A filled line's moons are the complement of its suns within the line.
+
+
+def get_full_mask(grid_size: int) -> int:
+    return (1 << grid_size) - 1
+
+
+@lru_cache(maxsize=None)
+def get_valid_lines(grid_size: int) -> tuple[int, ...]:
+    """
+    Returns every legal filled line of the given size, i.e. lines with the same number of suns
+    and moons and no 3 consecutive tiles with the same symbol.
+    """
+    full = get_full_mask(grid_size)
+    lines = []
+
+    for sun in range(1 << grid_size):
+        moon = full ^ sun
+
+        if sun.bit_count() * 2 != grid_size:
+            continue
+
+        if sun & (sun >> 1) & (sun >> 2) or moon & (moon >> 1) & (moon >> 2):
+            continue
+
+        lines.append(sun)
+
+    return tuple(lines)
+
+
+def filter_lines(
+    lines: tuple[int, ...], sun_clues: int, moon_clues: int, equal: int, times: int
+) -> list[int]:
+    """
+    Returns the lines that agree with the given clues and with the signs inside the line, where
+    bit k of `equal`/`times` is set if there is a sign between tile k and tile k + 1.
+    """
+    compatible = []
+
+    for sun in lines:
+        if sun & moon_clues or ~sun & sun_clues:
+            continue
+
+        # bit k is set if tiles k and k + 1 have different symbols
+        different = sun ^ (sun >> 1)
+        if different & equal or different & times != times:
+            continue
+
+        compatible.append(sun)
+
+    return compatible
+
+
+def get_vertical_masks(
+    grid_size: int, prev: int | None, prev_2: int | None, equal: int, times: int
+) -> tuple[int, int]:
+    """
+    Returns (forbidden, required) sun masks for a row given the two filled rows above it (None if
+    there is no such row) and the vertical signs between it and the row directly above.
+    """
+    full = get_full_mask(grid_size)
+    forbidden = 0
+    required = 0
+
+    if prev is not None:
+        prev_moon = full ^ prev
+
+        required |= (prev & equal) | (prev_moon & times)
+        forbidden |= (prev_moon & equal) | (prev & times)
+
+        if prev_2 is not None:
+            # no 3 consecutive tiles in a column
+            forbidden |= prev & prev_2
+            required |= prev_moon & (full ^ prev_2)
+
+    return forbidden, required
+
+
+def get_row_masks(board: Board) -> tuple[list[int], list[int], list[int], list[int], list[int], list[int]]:
+    """
+    Reads a board into per-row bitmasks (bit j is column j):
+
+    1. The suns placed on each row
+    2. The moons placed on each row
+    3. The "=" signs between (i, j) and (i, j + 1)
+    4. The "x" signs between (i, j) and (i, j + 1)
+    5. The "=" signs between (i, j) and (i + 1, j)
+    6. The "x" signs between (i, j) and (i + 1, j)
+    """
+    sun_clues = [0] * config.grid_size
+    moon_clues = [0] * config.grid_size
+    row_equal = [0] * config.grid_size
+    row_times = [0] * config.grid_size
+    down_equal = [0] * config.grid_size
+    down_times = [0] * config.grid_size
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            match board.get_symbol_at_posn((i, j)):
+                case SYMBOL.SUN:
+                    sun_clues[i] |= 1 << j
+                case SYMBOL.MOON:
+                    moon_clues[i] |= 1 << j
+
+    for (i, j), sign_set in board.get_all_signs().items():
+        for dir, sign in sign_set:
+            match (dir, sign):
+                case (DIRECTION.RIGHT, SIGN.EQUAL):
+                    row_equal[i] |= 1 << j
+                case (DIRECTION.RIGHT, SIGN.TIMES):
+                    row_times[i] |= 1 << j
+                case (DIRECTION.DOWN, SIGN.EQUAL):
+                    down_equal[i] |= 1 << j
+                case (DIRECTION.DOWN, SIGN.TIMES):
+                    down_times[i] |= 1 << j
+
+    return sun_clues, moon_clues, row_equal, row_times, down_equal, down_times
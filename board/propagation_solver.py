@@ -0,0 +1,362 @@
+from functools import lru_cache
+from typing import Iterator
+
+from board.board import Board
+from board.search_stats import search_stats
+from game.game_config import config
+from tango_types import SIGN, SYMBOL
+from utils import add_posns, direction_to_posn
+
+EMPTY = 0
+
+
+@lru_cache(maxsize=None)
+def _get_layout(grid_size: int) -> tuple[list[list[int]], list[list[int]], list[list[tuple[int, int]]]]:
+    """
+    Returns the static structure of a grid with cells indexed as (i * grid_size + j):
+    the cells of every row, the cells of every column, and for every cell the other two cells of
+    each window of 3 consecutive tiles containing it.
+    """
+    rows = [[i * grid_size + j for j in range(grid_size)] for i in range(grid_size)]
+    cols = [[i * grid_size + j for i in range(grid_size)] for j in range(grid_size)]
+
+    windows = [[] for _ in range(grid_size ** 2)]
+    for line in rows + cols:
+        for start in range(grid_size - 2):
+            a, b, c = line[start:start + 3]
+            windows[a].append((b, c))
+            windows[b].append((a, c))
+            windows[c].append((a, b))
+
+    return rows, cols, windows
+
+
+class _PropagationState:
+    """
+    Flat copy of a board used by the propagation solver. Cells hold EMPTY, SYMBOL.SUN.value or
+    SYMBOL.MOON.value, so the complement of a symbol v is (3 - v).
+
+    Every assignment is pushed onto a trail so the search can backtrack by undoing everything
+    that was assigned after a given trail length.
+    """
+
+    def __init__(self, board: Board):
+        self.size = config.grid_size
+        self.half = config.grid_size // 2
+        self.rows, self.cols, self.windows = _get_layout(config.grid_size)
+
+        self.cells = [EMPTY] * (self.size ** 2)
+        self.row_counts = [[0, 0, 0] for _ in range(self.size)]
+        self.col_counts = [[0, 0, 0] for _ in range(self.size)]
+
+        self.trail: list[int] = []
+        self.queue: list[int] = []
+
+        # for every cell, the cells it is connected to with a sign
+        self.links: list[list[tuple[int, SIGN]]] = [[] for _ in range(self.size ** 2)]
+        for from_posn, sign_set in board.get_all_signs().items():
+            for dir, sign in sign_set:
+                to_posn = add_posns(from_posn, direction_to_posn(dir))
+                from_idx = from_posn[0] * self.size + from_posn[1]
+                to_idx = to_posn[0] * self.size + to_posn[1]
+
+                self.links[from_idx].append((to_idx, sign))
+                self.links[to_idx].append((from_idx, sign))
+
+    def load(self, board: Board) -> bool:
+        """
+        Assigns every sun/moon on the board and propagates. Returns False if the board has no
+        solution.
+        """
+        for i in range(self.size):
+            for j in range(self.size):
+                symbol = board.get_symbol_at_posn((i, j))
+                if symbol in (SYMBOL.SUN, SYMBOL.MOON) and not self.assign(i * self.size + j, symbol.value):
+                    return False
+
+        return self.propagate()
+
+    def assign(self, idx: int, value: int) -> bool:
+        current = self.cells[idx]
+        if current != EMPTY:
+            return current == value
+
+        i, j = divmod(idx, self.size)
+        self.cells[idx] = value
+        self.trail.append(idx)
+        self.row_counts[i][value] += 1
+        self.col_counts[j][value] += 1
+        self.queue.append(idx)
+
+        return self.row_counts[i][value] <= self.half and self.col_counts[j][value] <= self.half
+
+    def propagate(self) -> bool:
+        """
+        Applies forced moves for every newly assigned cell until nothing changes:
+
+        1. A row/column that has (size / 2) of one symbol gets the complement everywhere else
+        2. Two equal tiles in a window of 3 force the complement on the remaining tile
+        3. A "=" forces the same symbol on the other side, a "x" forces the complement
+
+        Returns False (with the queue cleared) as soon as a contradiction is found.
+        """
+        while self.queue:
+            idx = self.queue.pop()
+            if search_stats.enabled:
+                search_stats.constraint_checks += 1
+
+            value = self.cells[idx]
+            other = 3 - value
+            i, j = divmod(idx, self.size)
+
+            for line, counts in ((self.rows[i], self.row_counts[i]), (self.cols[j], self.col_counts[j])):
+                if counts[value] == self.half:
+                    for k in line:
+                        if self.cells[k] == EMPTY and not self.assign(k, other):
+                            self.queue.clear()
+                            return False
+
+            for a, b in self.windows[idx]:
+                a_value = self.cells[a]
+                b_value = self.cells[b]
+
+                if a_value == value and b_value == value:
+                    self.queue.clear()
+                    return False
+                elif a_value == value and b_value == EMPTY:
+                    forced = self.assign(b, other)
+                elif b_value == value and a_value == EMPTY:
+                    forced = self.assign(a, other)
+                else:
+                    continue
+
+                if not forced:
+                    self.queue.clear()
+                    return False
+
+            for linked_idx, sign in self.links[idx]:
+                if not self.assign(linked_idx, value if sign == SIGN.EQUAL else other):
+                    self.queue.clear()
+                    return False
+
+        return True
+
+    def undo(self, trail_length: int) -> None:
+        while len(self.trail) > trail_length:
+            idx = self.trail.pop()
+            i, j = divmod(idx, self.size)
+            value = self.cells[idx]
+
+            self.row_counts[i][value] -= 1
+            self.col_counts[j][value] -= 1
+            self.cells[idx] = EMPTY
+
+        self.queue.clear()
+
+    def choose_cell(self) -> int | None:
+        """
+        Returns the empty cell whose row and column have the fewest empty tiles left, or None if
+        the grid is filled.
+        """
+        best_idx = None
+        best_score = None
+
+        for idx in range(self.size ** 2):
+            if self.cells[idx] != EMPTY:
+                continue
+
+            i, j = divmod(idx, self.size)
+            row_counts = self.row_counts[i]
+            col_counts = self.col_counts[j]
+            score = 2 * self.size - row_counts[1] - row_counts[2] - col_counts[1] - col_counts[2]
+
+            if best_score is None or score < best_score:
+                best_idx = idx
+                best_score = score
+
+        return best_idx
+
+
+class PropagationSolver:
+    """
+    Solver that propagates forced moves after every assignment (see _PropagationState.propagate)
+    and branches on the most constrained cell, backtracking by undoing the trail. Every filled
+    grid it reaches satisfies all rules, so no leaf needs to be re-validated.
+    """
+
+    @staticmethod
+    def _solve(state: _PropagationState) -> bool:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        idx = state.choose_cell()
+        if idx is None:
+            return True
+
+        for value in (SYMBOL.SUN.value, SYMBOL.MOON.value):
+            trail_length = len(state.trail)
+
+            if state.assign(idx, value) and state.propagate() and PropagationSolver._solve(state):
+                return True
+
+            state.undo(trail_length)
+
+        if search_stats.enabled:
+            search_stats.backtracks += 1
+
+        return False
+
+    @staticmethod
+    def solve(board: Board) -> bool:
+        state = _PropagationState(board)
+        if not state.load(board) or not PropagationSolver._solve(state):
+            return False
+
+        board.set_symbol_values(state.cells)
+
+        return True
+
+    @staticmethod
+    def _enumerate(state: _PropagationState) -> Iterator[list[int]]:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        idx = state.choose_cell()
+        if idx is None:
+            yield list(state.cells)
+            return
+
+        for value in (SYMBOL.SUN.value, SYMBOL.MOON.value):
+            trail_length = len(state.trail)
+
+            if state.assign(idx, value) and state.propagate():
+                yield from PropagationSolver._enumerate(state)
+
+            state.undo(trail_length)
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        """
+        Yields every solution of the board (up to `limit`) as a new board with the same signs.
+        """
+        state = _PropagationState(board)
+        if not state.load(board):
+            return
+
+        for num_found, values in enumerate(PropagationSolver._enumerate(state)):
+            if limit is not None and num_found >= limit:
+                return
+
+            solution = board.copy()
+            solution.set_symbol_values(values)
+            yield solution
+
+    @staticmethod
+    def _count_solutions(state: _PropagationState, limit: int | None) -> int:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        idx = state.choose_cell()
+        if idx is None:
+            return 1
+
+        num_solutions = 0
+        for value in (SYMBOL.SUN.value, SYMBOL.MOON.value):
+            if limit is not None and num_solutions >= limit:
+                break
+
+            trail_length = len(state.trail)
+
+            if state.assign(idx, value) and state.propagate():
+                num_solutions += PropagationSolver._count_solutions(
+                    state, None if limit is None else limit - num_solutions
+                )
+
+            state.undo(trail_length)
+
+        if search_stats.enabled and not num_solutions:
+            search_stats.backtracks += 1
+
+        return num_solutions
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        """
+        Counts the solutions of the board, stopping as soon as `limit` solutions have been found.
+        The result is exact if it is smaller than `limit`.
+        """
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        state = _PropagationState(board)
+        if not state.load(board):
+            return 0
+
+        return PropagationSolver._count_solutions(state, limit)
+
+    @staticmethod
+    def _find_other_solution(state: _PropagationState, solution: list[int]) -> bool:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        idx = state.choose_cell()
+        if idx is None:
+            # every cell matches the known solution
+            return False
+
+        value = solution[idx]
+        trail_length = len(state.trail)
+
+        # every rule holds in the known solution, so following it never leads to a contradiction
+        state.assign(idx, value)
+        state.propagate()
+        if PropagationSolver._find_other_solution(state, solution):
+            return True
+
+        state.undo(trail_length)
+
+        # any solution below here differs from the known solution, so the first one found will do
+        if state.assign(idx, 3 - value) and state.propagate() and PropagationSolver._solve(state):
+            return True
+
+        state.undo(trail_length)
+
+        if search_stats.enabled:
+            search_stats.backtracks += 1
+
+        return False
+
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        """
+        Checks whether the board has a solution other than `solution`, which must be one of its
+        solutions.
+
+        The search follows `solution` down to its last decision and then backtracks, trying the
+        complement of the known value at every decision. Other solutions usually differ from the
+        known one in the cells decided last, where only a few cells are left to search, and below
+        a complemented cell any solution is a different one so plain solving is enough.
+        """
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        state = _PropagationState(board)
+        if not state.load(board):
+            return False
+
+        return PropagationSolver._find_other_solution(state, list(solution.get_symbol_values()))
+
+    @staticmethod
+    def is_intuitively_solvable(board: Board) -> bool:
+        # imported here since the deducer behind it is built on this module
+        from board.solver import Solver
+
+        return Solver.is_intuitively_solvable(board)
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        return PropagationSolver.count_solutions(board)
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        return PropagationSolver.count_solutions(board, limit=2) == 1
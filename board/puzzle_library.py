@@ -0,0 +1,333 @@
+import mmap
+import os
+import random
+import re
+import struct
+
+import numpy as np
+
+from board.batch_validator import EDGE_TIMES, validate_boards
+from board.bitboard import BitBoard
+from board.board import Board
+from board.symmetry import get_canonical_key, get_canonical_key_size
+from game.game_config import config
+from tango_types import SIGN, SYMBOL
+from utils import add_posns, direction_to_posn, get_edges
+
+MAGIC = b"TNGO"
+VERSION = 1
+
+# magic, version, grid size, difficulty, padding
+HEADER = struct.Struct("<4sBBBx")
+
+# Every puzzle is stored as a fixed-width little-endian bit-packed record:
+#
+# 1. 2 bits per tile for the clues (0 = empty, 1 = sun, 2 = moon), row-major
+# 2. 2 bits per edge for the signs (0 = none, 1 = "=", 2 = "x"), going right then going down
+# 3. 1 bit per tile for the solution (1 = sun, 0 = moon), row-major
+#
+# so a record can be decoded straight out of a memory-mapped file by its index.
+#
+# Next to every puzzle file, a .keys file holds the canonical key of every puzzle (see
+# symmetry.get_canonical_key) in the same order, so duplicates can be found without decoding the
+# puzzles.
+
+
+def get_record_size(grid_size: int) -> int:
+    num_bits = 3 * grid_size ** 2 + 2 * len(get_edges(grid_size))
+    return (num_bits + 7) // 8
+
+
+def _pack_puzzle(board: Board, solved_board: Board) -> bytes:
+    value = 0
+    offset = 0
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            symbol = board.get_symbol_at_posn((i, j))
+            if symbol in (SYMBOL.SUN, SYMBOL.MOON):
+                value |= symbol.value << offset
+            offset += 2
+
+    all_signs = board.get_all_signs()
+    for from_posn, dir in get_edges(config.grid_size):
+        for sign_dir, sign in all_signs.get(from_posn, ()):
+            if sign_dir == dir:
+                value |= (sign.value + 1) << offset
+                break
+        offset += 2
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            if solved_board.get_symbol_at_posn((i, j)) == SYMBOL.SUN:
+                value |= 1 << offset
+            offset += 1
+
+    return value.to_bytes(get_record_size(config.grid_size), "little")
+
+
+def _unpack_puzzle(record: bytes) -> tuple[Board, Board]:
+    value = int.from_bytes(record, "little")
+    board = BitBoard()
+    solved_board = BitBoard()
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            symbol_value = value & 0b11
+            if symbol_value:
+                board.set_symbol_at_posn((i, j), SYMBOL(symbol_value))
+            value >>= 2
+
+    for from_posn, dir in get_edges(config.grid_size):
+        sign_value = value & 0b11
+        if sign_value:
+            to_posn = add_posns(from_posn, direction_to_posn(dir))
+            board.set_sign(from_posn, to_posn, SIGN(sign_value - 1))
+            solved_board.set_sign(from_posn, to_posn, SIGN(sign_value - 1))
+        value >>= 2
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            solved_board.set_symbol_at_posn((i, j), SYMBOL.SUN if value & 1 else SYMBOL.MOON)
+            value >>= 1
+
+    return board, solved_board
+
+
+class PuzzleLibrary:
+    """
+    On-disk store of generated puzzles and their solutions. Puzzles are kept in one file per
+    (grid size, difficulty) made of a header followed by fixed-width records, which are read back
+    through mmap so any puzzle can be accessed by index without parsing the rest of the file.
+
+    Puzzles that are a rotation/reflection of a stored puzzle, with or without suns and moons
+    swapped, aren't stored again (see symmetry.get_canonical_key). The canonical keys of stored
+    puzzles are read from the .keys file of their puzzle file the first time they're needed.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+        # mapping of (grid size, difficulty) => memory-mapped puzzle file
+        self._maps: dict[tuple[int, int], mmap.mmap] = {}
+
+        # mapping of (grid size, difficulty) => canonical key => index, loaded on first use
+        self._indices: dict[tuple[int, int], dict[bytes, int]] = {}
+
+    def _get_file_path(self, grid_size: int, difficulty: int) -> str:
+        return os.path.join(self._path, f"{grid_size}x{grid_size}_{difficulty}.tango")
+
+    def _get_keys_file_path(self, grid_size: int, difficulty: int) -> str:
+        return os.path.join(self._path, f"{grid_size}x{grid_size}_{difficulty}.keys")
+
+    def _get_map(self, grid_size: int, difficulty: int) -> mmap.mmap | None:
+        key = (grid_size, difficulty)
+        if key in self._maps:
+            return self._maps[key]
+
+        file_path = self._get_file_path(grid_size, difficulty)
+        if not os.path.exists(file_path):
+            return None
+
+        # an interrupted write can leave a file without a full header, which can't be mapped or read
+        if os.path.getsize(file_path) < HEADER.size:
+            raise ValueError(f"{file_path} is not a valid puzzle file")
+
+        with open(file_path, "rb") as f:
+            puzzle_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, file_grid_size, file_difficulty = HEADER.unpack_from(puzzle_map)
+        if magic != MAGIC or version != VERSION or (file_grid_size, file_difficulty) != key:
+            puzzle_map.close()
+            raise ValueError(f"{file_path} is not a valid puzzle file")
+
+        self._maps[key] = puzzle_map
+        return puzzle_map
+
+    def _close_map(self, grid_size: int, difficulty: int) -> None:
+        puzzle_map = self._maps.pop((grid_size, difficulty), None)
+        if puzzle_map is not None:
+            puzzle_map.close()
+
+    def _load_indices(self, difficulty: int) -> dict[bytes, int]:
+        """
+        Reads the canonical keys of the current grid size's puzzles from the .keys file. Keys of
+        puzzles that are missing from it (e.g. if it was written by an older version or a write
+        was cut short) are computed and appended, and keys without a puzzle are cut off.
+        """
+        grid_size = config.grid_size
+        key_size = get_canonical_key_size(grid_size)
+        num_puzzles = self.count(grid_size, difficulty)
+        keys_file_path = self._get_keys_file_path(grid_size, difficulty)
+
+        data = b""
+        if os.path.exists(keys_file_path):
+            with open(keys_file_path, "rb") as f:
+                data = f.read(num_puzzles * key_size)
+
+        num_keys = len(data) // key_size
+        indices = {}
+        for index in range(num_keys):
+            indices.setdefault(data[index * key_size:(index + 1) * key_size], index)
+
+        with open(keys_file_path, "ab") as f:
+            f.truncate(num_keys * key_size)
+
+            for index in range(num_keys, num_puzzles):
+                board, _ = self.get(grid_size, index, difficulty)
+                canonical_key = get_canonical_key(board)
+                f.write(canonical_key)
+                indices.setdefault(canonical_key, index)
+
+        return indices
+
+    def _get_indices(self, difficulty: int) -> dict[bytes, int]:
+        key = (config.grid_size, difficulty)
+        if key not in self._indices:
+            self._indices[key] = self._load_indices(difficulty)
+
+        return self._indices[key]
+
+    def find(self, board: Board, difficulty: int = 0) -> int | None:
+        """
+        Returns the index of the stored puzzle that is the same as the board up to symmetry, or
+        None if there is none.
+        """
+        return self._get_indices(difficulty).get(get_canonical_key(board))
+
+    def add(self, board: Board, solved_board: Board, difficulty: int = 0) -> int:
+        """
+        Appends a puzzle for the current grid size and returns its index. If the same puzzle up
+        to symmetry is already stored, nothing is written and its index is returned instead.
+        """
+        indices = self._get_indices(difficulty)
+        canonical_key = get_canonical_key(board)
+        if canonical_key in indices:
+            return indices[canonical_key]
+
+        file_path = self._get_file_path(config.grid_size, difficulty)
+        index = self.count(config.grid_size, difficulty)
+
+        # the mapping doesn't see data appended to the file, it's reopened on the next read
+        self._close_map(config.grid_size, difficulty)
+
+        with open(file_path, "ab") as f:
+            if f.tell() == 0:
+                f.write(HEADER.pack(MAGIC, VERSION, config.grid_size, difficulty))
+            f.write(_pack_puzzle(board, solved_board))
+
+        # written after the puzzle, so a key never lacks its puzzle if this is cut short
+        with open(self._get_keys_file_path(config.grid_size, difficulty), "ab") as f:
+            f.write(canonical_key)
+
+        indices[canonical_key] = index
+        return index
+
+    def count(self, grid_size: int, difficulty: int = 0) -> int:
+        puzzle_map = self._get_map(grid_size, difficulty)
+        if puzzle_map is None:
+            return 0
+
+        return (len(puzzle_map) - HEADER.size) // get_record_size(grid_size)
+
+    def get(self, grid_size: int, index: int, difficulty: int = 0) -> tuple[Board, Board]:
+        """
+        Returns the (board, solved board) pair stored at index. Boards are built for the current
+        grid size, so it has to match grid_size.
+        """
+        if grid_size != config.grid_size:
+            raise ValueError(f"Can't load a {grid_size}x{grid_size} puzzle on a {config.grid_size}x{config.grid_size} grid")
+
+        if not 0 <= index < self.count(grid_size, difficulty):
+            raise IndexError(f"No puzzle at index {index}")
+
+        record_size = get_record_size(grid_size)
+        start = HEADER.size + index * record_size
+
+        return _unpack_puzzle(self._maps[(grid_size, difficulty)][start:start + record_size])
+
+    def get_collections(self) -> list[tuple[int, int]]:
+        """
+        Returns the (grid size, difficulty) of every puzzle file in the library.
+        """
+        collections = []
+        for file_name in sorted(os.listdir(self._path)):
+            match = re.fullmatch(r"(\d+)x\1_(\d+)\.tango", file_name)
+            if match:
+                collections.append((int(match.group(1)), int(match.group(2))))
+
+        return collections
+
+    def get_arrays(self, grid_size: int, difficulty: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Decodes every puzzle of a file at once into the arrays used by batch_validator:
+
+        1. (N, n, n) clue symbol values, with SYMBOL.NONE for empty tiles
+        2. (N, n, n) solution symbol values
+        3. (N, n, n - 1) edge codes of the signs going right
+        4. (N, n - 1, n) edge codes of the signs going down
+
+        Unlike get, this doesn't depend on the current grid size.
+        """
+        n = grid_size
+        num_puzzles = self.count(grid_size, difficulty)
+        if num_puzzles == 0:
+            return (
+                np.empty((0, n, n), dtype=np.uint8),
+                np.empty((0, n, n), dtype=np.uint8),
+                np.empty((0, n, n - 1), dtype=np.uint8),
+                np.empty((0, n - 1, n), dtype=np.uint8),
+            )
+
+        record_size = get_record_size(grid_size)
+        records = np.frombuffer(
+            self._maps[(grid_size, difficulty)], dtype=np.uint8, count=num_puzzles * record_size, offset=HEADER.size
+        )
+        bits = np.unpackbits(records.reshape(num_puzzles, record_size), axis=1, bitorder="little")
+
+        # 2-bit fields are stored low bit first
+        num_tiles = n ** 2
+        num_edges = len(get_edges(grid_size))
+        fields = bits[:, 0:2 * (num_tiles + num_edges):2] + 2 * bits[:, 1:2 * (num_tiles + num_edges):2]
+
+        clues = fields[:, :num_tiles].reshape(num_puzzles, n, n)
+        clues = np.where(clues == 0, SYMBOL.NONE.value, clues).astype(np.uint8)
+
+        signs = fields[:, num_tiles:]
+        right_signs = signs[:, :n * (n - 1)].reshape(num_puzzles, n, n - 1)
+        down_signs = signs[:, n * (n - 1):].reshape(num_puzzles, n - 1, n)
+
+        solution_bits = bits[:, 2 * (num_tiles + num_edges):2 * (num_tiles + num_edges) + num_tiles]
+        solutions = np.where(solution_bits == 1, SYMBOL.SUN.value, SYMBOL.MOON.value).astype(np.uint8)
+
+        return clues, solutions.reshape(num_puzzles, n, n), right_signs, down_signs
+
+    def verify(self, grid_size: int, difficulty: int = 0) -> np.ndarray:
+        """
+        Returns whether each puzzle of a file is consistent: every sign code is a real sign, and
+        its solution is solved under its signs and agrees with every clue. This only checks the
+        stored data, not that the solution is unique.
+        """
+        clues, solutions, right_signs, down_signs = self.get_arrays(grid_size, difficulty)
+        _, solved = validate_boards(solutions, right_signs, down_signs)
+
+        clues_match = ((clues == SYMBOL.NONE.value) | (clues == solutions)).all(axis=(1, 2))
+
+        # validate_boards reads unknown sign codes as no sign, but they can't be loaded as boards
+        signs_known = (right_signs <= EDGE_TIMES).all(axis=(1, 2)) & (down_signs <= EDGE_TIMES).all(axis=(1, 2))
+        return solved & clues_match & signs_known
+
+    def get_random(self, grid_size: int, difficulty: int = 0) -> tuple[Board, Board] | None:
+        num_puzzles = self.count(grid_size, difficulty)
+        if num_puzzles == 0:
+            return None
+
+        return self.get(grid_size, random.randrange(num_puzzles), difficulty)
+
+    def close(self) -> None:
+        for puzzle_map in self._maps.values():
+            puzzle_map.close()
+
+        self._maps.clear()
+        self._indices.clear()
@@ -0,0 +1,218 @@
+from typing import Iterator
+
+from board.board import Board
+from board.line_table import filter_lines, get_row_masks, get_valid_lines, get_vertical_masks
+from board.search_stats import search_stats
+from board.solver import Solver
+from game.game_config import config
+from tango_types import SYMBOL
+
+
+class _RowSearch:
+    """
+    Row-at-a-time search state. Each row is picked from the precomputed legal lines that agree
+    with its clues and horizontal signs, and is then checked against the rows above it with
+    bitmasks:
+
+    1. Columns that already have (size / 2) suns/moons can't get another one
+    2. Columns whose last 2 tiles are the same symbol must get the complement
+    3. Vertical signs from the previous row force the same/complement symbol
+    """
+
+    def __init__(self, board: Board):
+        self.size = config.grid_size
+        self.half = config.grid_size // 2
+
+        sun_clues, moon_clues, row_equal, row_times, down_equal, down_times = get_row_masks(board)
+        lines = get_valid_lines(config.grid_size)
+
+        self.candidates = [
+            filter_lines(lines, sun_clues[i], moon_clues[i], row_equal[i], row_times[i])
+            for i in range(self.size)
+        ]
+        self.down_equal = down_equal
+        self.down_times = down_times
+
+        self.rows: list[int] = []
+        self.col_sun_counts = [0] * self.size
+
+        # stack of masks of the columns that already have (size / 2) suns/moons
+        self.full_columns = [(0, 0)]
+
+    def get_allowed(self) -> tuple[int, int]:
+        """
+        Returns (forbidden, required) sun masks for the next row given the rows placed so far.
+        """
+        i = len(self.rows)
+
+        # columns that can't take another sun/moon
+        forbidden, required = self.full_columns[-1]
+
+        if i >= 1:
+            vertical_forbidden, vertical_required = get_vertical_masks(
+                self.size,
+                self.rows[-1],
+                self.rows[-2] if i >= 2 else None,
+                self.down_equal[i - 1],
+                self.down_times[i - 1],
+            )
+            forbidden |= vertical_forbidden
+            required |= vertical_required
+
+        return forbidden, required
+
+    def push(self, sun: int) -> None:
+        self.rows.append(sun)
+
+        sun_full = 0
+        moon_full = 0
+        for j in range(self.size):
+            if sun >> j & 1:
+                self.col_sun_counts[j] += 1
+
+            if self.col_sun_counts[j] == self.half:
+                sun_full |= 1 << j
+            if len(self.rows) - self.col_sun_counts[j] == self.half:
+                moon_full |= 1 << j
+
+        self.full_columns.append((sun_full, moon_full))
+
+    def pop(self) -> None:
+        sun = self.rows.pop()
+        self.full_columns.pop()
+
+        for j in range(self.size):
+            if sun >> j & 1:
+                self.col_sun_counts[j] -= 1
+
+    def get_next_rows(self) -> list[int]:
+        forbidden, required = self.get_allowed()
+        if forbidden & required:
+            return []
+
+        return [
+            sun for sun in self.candidates[len(self.rows)]
+            if not sun & forbidden and sun & required == required
+        ]
+
+
+class RowSolver:
+    """
+    Solver that fills a whole row at a time from the table of legal lines (see line_table).
+    """
+
+    @staticmethod
+    def _solve(search: _RowSearch) -> bool:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        if len(search.rows) == search.size:
+            return True
+
+        for sun in search.get_next_rows():
+            search.push(sun)
+            if RowSolver._solve(search):
+                return True
+
+            search.pop()
+
+        if search_stats.enabled:
+            search_stats.backtracks += 1
+
+        return False
+
+    @staticmethod
+    def solve(board: Board) -> bool:
+        search = _RowSearch(board)
+        if not RowSolver._solve(search):
+            return False
+
+        for i, sun in enumerate(search.rows):
+            for j in range(search.size):
+                board.set_symbol_at_posn((i, j), SYMBOL.SUN if sun >> j & 1 else SYMBOL.MOON)
+
+        return True
+
+    @staticmethod
+    def _enumerate(search: _RowSearch) -> Iterator[list[int]]:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        if len(search.rows) == search.size:
+            yield list(search.rows)
+            return
+
+        for sun in search.get_next_rows():
+            search.push(sun)
+            yield from RowSolver._enumerate(search)
+            search.pop()
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        """
+        Yields every solution of the board (up to `limit`) as a new board with the same signs.
+        """
+        for num_found, rows in enumerate(RowSolver._enumerate(_RowSearch(board))):
+            if limit is not None and num_found >= limit:
+                return
+
+            solution = board.copy()
+            for i, sun in enumerate(rows):
+                for j in range(config.grid_size):
+                    solution.set_symbol_at_posn((i, j), SYMBOL.SUN if sun >> j & 1 else SYMBOL.MOON)
+            yield solution
+
+    @staticmethod
+    def _count_solutions(search: _RowSearch, limit: int | None) -> int:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        if len(search.rows) == search.size:
+            return 1
+
+        num_solutions = 0
+        for sun in search.get_next_rows():
+            if limit is not None and num_solutions >= limit:
+                break
+
+            search.push(sun)
+            num_solutions += RowSolver._count_solutions(
+                search, None if limit is None else limit - num_solutions
+            )
+            search.pop()
+
+        if search_stats.enabled and not num_solutions:
+            search_stats.backtracks += 1
+
+        return num_solutions
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        """
+        Counts the solutions of the board, stopping as soon as `limit` solutions have been found.
+        The result is exact if it is smaller than `limit`.
+        """
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        return RowSolver._count_solutions(_RowSearch(board), limit)
+
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        """
+        Checks whether the board has a solution other than `solution`, which must be one of its
+        solutions.
+        """
+        return RowSolver.count_solutions(board, limit=2) > 1
+
+    @staticmethod
+    def is_intuitively_solvable(board: Board) -> bool:
+        return Solver.is_intuitively_solvable(board)
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        return RowSolver.count_solutions(board)
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        return RowSolver.count_solutions(board, limit=2) == 1
@@ -0,0 +1,337 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterator
+
+from board.board import Board
+from board.search_stats import search_stats
+from board.solver import Solver
+from game.game_config import config
+from tango_types import SIGN, SYMBOL
+from utils import add_posns, direction_to_posn
+
+# A clause is a list of literals: +v means tile v - 1 (row-major) is a sun, -v that it's a moon.
+# Variables after the tiles are auxiliary variables of the cardinality constraints.
+Clause = list[int]
+
+
+def _get_at_most_clauses(literals: list[int], k: int, first_var: int) -> list[tuple[int, ...]]:
+    """
+    Returns the clauses of "at most k of the literals are true" as a sequential counter: variable
+    s(i, j) (numbered from first_var) is forced to be true once at least j of the first i + 1
+    literals are, and literal i can't be true once k of the ones before it are. This takes
+    O(n * k) clauses instead of one clause for every k + 1 literals, and unit propagation still
+    rules out a literal as soon as k others are true.
+    """
+    n = len(literals)
+
+    def s(i: int, j: int) -> int:
+        return first_var + i * k + j - 1
+
+    clauses = [(-literals[0], s(0, 1))]
+    clauses += [(-s(0, j),) for j in range(2, k + 1)]
+
+    for i in range(1, n - 1):
+        clauses.append((-literals[i], s(i, 1)))
+        clauses.append((-s(i - 1, 1), s(i, 1)))
+
+        for j in range(2, k + 1):
+            clauses.append((-literals[i], -s(i - 1, j - 1), s(i, j)))
+            clauses.append((-s(i - 1, j), s(i, j)))
+
+        clauses.append((-literals[i], -s(i - 1, k)))
+
+    clauses.append((-literals[n - 1], -s(n - 2, k)))
+
+    return clauses
+
+
+def _get_num_at_most_vars(n: int, k: int) -> int:
+    return (n - 1) * k
+
+
+@lru_cache(maxsize=None)
+def _get_rule_clauses(grid_size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Returns the clauses every board of the given size has to satisfy:
+
+    1. No 3 consecutive suns/moons: (a or b or c) and (not a or not b or not c) for every window
+    2. At most (size / 2) suns/moons in a line (see _get_at_most_clauses), which also makes every
+    filled line balanced
+    """
+    half = grid_size // 2
+    rows = [[i * grid_size + j + 1 for j in range(grid_size)] for i in range(grid_size)]
+    cols = [[i * grid_size + j + 1 for i in range(grid_size)] for j in range(grid_size)]
+
+    clauses = []
+    next_var = grid_size ** 2 + 1
+    for line in rows + cols:
+        for start in range(grid_size - 2):
+            window = line[start:start + 3]
+            clauses.append(tuple(window))
+            clauses.append(tuple(-var for var in window))
+
+        for literals in (line, [-var for var in line]):
+            clauses += _get_at_most_clauses(literals, half, next_var)
+            next_var += _get_num_at_most_vars(grid_size, half)
+
+    return tuple(clauses)
+
+
+def encode_board(board: Board) -> list[Clause]:
+    """
+    Returns the CNF of the board: the rules of the grid, a unit clause for every sun/moon and 2
+    clauses for every sign. Guesses count as empty tiles.
+    """
+    clauses = [list(clause) for clause in _get_rule_clauses(config.grid_size)]
+
+    for i in range(config.grid_size):
+        for j in range(config.grid_size):
+            var = i * config.grid_size + j + 1
+            match board.get_symbol_at_posn((i, j)):
+                case SYMBOL.SUN:
+                    clauses.append([var])
+                case SYMBOL.MOON:
+                    clauses.append([-var])
+
+    for from_posn, sign_set in board.get_all_signs().items():
+        for dir, sign in sign_set:
+            to_posn = add_posns(from_posn, direction_to_posn(dir))
+            a = from_posn[0] * config.grid_size + from_posn[1] + 1
+            b = to_posn[0] * config.grid_size + to_posn[1] + 1
+
+            if sign == SIGN.EQUAL:
+                clauses += [[a, -b], [-a, b]]
+            else:
+                clauses += [[a, b], [-a, -b]]
+
+    return clauses
+
+
+class _SatState:
+    """
+    DPLL state over a CNF with two watched literals per clause. values[v] is 1 if variable v is
+    true, -1 if false and 0 if unassigned, and every assignment is pushed onto a trail so the
+    search can backtrack by undoing everything after a given trail length.
+
+    Only the first `num_tiles` variables are branched on. Once they're all assigned without a
+    conflict, the auxiliary variables left unassigned can all be false: every clause that needs
+    one of them to be true has already forced it through propagation. Branching on them as well
+    would find the same solution more than once.
+    """
+
+    def __init__(self, clauses: list[Clause], num_tiles: int):
+        self.num_tiles = num_tiles
+        num_vars = max([num_tiles] + [abs(literal) for clause in clauses for literal in clause])
+        self.values = [0] * (num_vars + 1)
+        self.trail: list[int] = []
+
+        # index of the first trail entry whose consequences haven't been propagated
+        self.propagated = 0
+
+        self.clauses: list[Clause] = []
+        self.units: list[int] = []
+
+        # mapping of literal => clauses watching it, visited when it becomes false
+        self.watches: dict[int, list[int]] = defaultdict(list)
+
+        for clause in clauses:
+            if len(clause) == 1:
+                self.units.append(clause[0])
+                continue
+
+            self.watches[clause[0]].append(len(self.clauses))
+            self.watches[clause[1]].append(len(self.clauses))
+            self.clauses.append(clause)
+
+    def get_value(self, literal: int) -> int:
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def assign(self, literal: int) -> bool:
+        value = self.get_value(literal)
+        if value:
+            return value == 1
+
+        self.values[abs(literal)] = 1 if literal > 0 else -1
+        self.trail.append(literal)
+
+        return True
+
+    def load(self) -> bool:
+        return all(self.assign(literal) for literal in self.units) and self.propagate()
+
+    def propagate(self) -> bool:
+        """
+        Assigns the last literal of every clause whose other literals are all false, until
+        nothing changes. Returns False as soon as a clause has all of its literals false.
+        """
+        while self.propagated < len(self.trail):
+            false_literal = -self.trail[self.propagated]
+            self.propagated += 1
+
+            watchers = self.watches[false_literal]
+            kept = []
+
+            for k, clause_idx in enumerate(watchers):
+                clause = self.clauses[clause_idx]
+
+                # keep the other watched literal first
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+
+                if self.get_value(clause[0]) == 1:
+                    kept.append(clause_idx)
+                    continue
+
+                for m in range(2, len(clause)):
+                    if self.get_value(clause[m]) != -1:
+                        clause[1], clause[m] = clause[m], clause[1]
+                        self.watches[clause[1]].append(clause_idx)
+                        break
+                else:
+                    kept.append(clause_idx)
+
+                    if not self.assign(clause[0]):
+                        self.watches[false_literal] = kept + watchers[k + 1:]
+                        return False
+
+            self.watches[false_literal] = kept
+
+        return True
+
+    def undo(self, trail_length: int) -> None:
+        while len(self.trail) > trail_length:
+            self.values[abs(self.trail.pop())] = 0
+
+        self.propagated = min(self.propagated, trail_length)
+
+    def choose_var(self) -> int | None:
+        """
+        Returns an unassigned tile of the row or column with the fewest unassigned tiles left, or
+        None if every tile is assigned. Going row by row instead gets stuck refuting the same
+        column conflicts over and over on large grids.
+        """
+        size = config.grid_size
+        values = self.values
+        row_empty = [sum(not values[i * size + j + 1] for j in range(size)) for i in range(size)]
+        col_empty = [sum(not values[i * size + j + 1] for i in range(size)) for j in range(size)]
+
+        best_var = None
+        best_score = None
+        for var in range(1, self.num_tiles + 1):
+            if values[var]:
+                continue
+
+            i, j = divmod(var - 1, size)
+            score = min(row_empty[i], col_empty[j])
+            if best_score is None or score < best_score:
+                best_var = var
+                best_score = score
+
+        return best_var
+
+
+class SatSolver:
+    """
+    Solver that encodes the board as CNF (see encode_board) and runs a plain DPLL search with unit
+    propagation. It needs no solver library, but is mostly useful to cross-check the other solvers
+    since it doesn't learn from conflicts.
+    """
+
+    @staticmethod
+    def _load(board: Board) -> _SatState | None:
+        state = _SatState(encode_board(board), config.grid_size ** 2)
+        return state if state.load() else None
+
+    @staticmethod
+    def _enumerate(state: _SatState) -> Iterator[list[int]]:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        var = state.choose_var()
+        if var is None:
+            yield [SYMBOL.SUN.value if value == 1 else SYMBOL.MOON.value for value in state.values[1:state.num_tiles + 1]]
+            return
+
+        found = False
+        for literal in (var, -var):
+            trail_length = len(state.trail)
+
+            if state.assign(literal) and state.propagate():
+                for values in SatSolver._enumerate(state):
+                    found = True
+                    yield values
+
+            state.undo(trail_length)
+
+        if search_stats.enabled and not found:
+            search_stats.backtracks += 1
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        """
+        Yields every solution of the board (up to `limit`) as a new board with the same signs.
+        """
+        state = SatSolver._load(board)
+        if state is None:
+            return
+
+        for num_found, values in enumerate(SatSolver._enumerate(state)):
+            if limit is not None and num_found >= limit:
+                return
+
+            solution = board.copy()
+            solution.set_symbol_values(values)
+            yield solution
+
+    @staticmethod
+    def solve(board: Board) -> bool:
+        state = SatSolver._load(board)
+        values = next(SatSolver._enumerate(state), None) if state is not None else None
+        if values is None:
+            return False
+
+        board.set_symbol_values(values)
+
+        return True
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        """
+        Counts the solutions of the board, stopping as soon as `limit` solutions have been found.
+        The result is exact if it is smaller than `limit`.
+        """
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        state = SatSolver._load(board)
+        if state is None:
+            return 0
+
+        num_solutions = 0
+        for _ in SatSolver._enumerate(state):
+            num_solutions += 1
+            if limit is not None and num_solutions >= limit:
+                break
+
+        return num_solutions
+
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        """
+        Checks whether the board has a solution other than `solution`, which must be one of its
+        solutions.
+        """
+        return SatSolver.count_solutions(board, limit=2) > 1
+
+    @staticmethod
+    def is_intuitively_solvable(board: Board) -> bool:
+        return Solver.is_intuitively_solvable(board)
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        return SatSolver.count_solutions(board)
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        return SatSolver.count_solutions(board, limit=2) == 1
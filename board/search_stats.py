@@ -0,0 +1,69 @@
+import copy
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class SearchStats:
+    """
+    Counters updated by the solvers and the generator while they search. Counting is off by default
+    and only costs a flag check per counted event; turn it on with `enabled` around the code being
+    measured.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        # number of partial boards visited by a search
+        self.nodes = 0
+
+        # number of branches a search abandoned because they led to no solution
+        self.backtracks = 0
+
+        # number of placed tiles checked against the rules: Board.is_valid/is_valid_after calls, and
+        # tiles whose rules PropagationSolver and IntuitiveDeducer propagated
+        self.constraint_checks = 0
+
+        # number of count_solutions calls on any solver
+        self.solution_count_calls = 0
+
+        # number of Solver.is_intuitively_solvable calls
+        self.intuitive_checks = 0
+
+        # mapping of phase name => seconds spent in it
+        self.phase_times: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Adds the wall time spent in the block to `phase_times[name]` when counting is enabled.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0) + time.perf_counter() - start_time
+
+    def snapshot(self) -> "SearchStats":
+        stats = copy.copy(self)
+        stats.phase_times = dict(self.phase_times)
+        return stats
+
+    def __str__(self) -> str:
+        lines = [f"{name:<24} {seconds * 1000:10.2f}ms" for name, seconds in self.phase_times.items()]
+        lines.append(f"{'total':<24} {sum(self.phase_times.values()) * 1000:10.2f}ms")
+        lines.append(f"{'nodes':<24} {self.nodes:10}")
+        lines.append(f"{'backtracks':<24} {self.backtracks:10}")
+        lines.append(f"{'constraint checks':<24} {self.constraint_checks:10}")
+        lines.append(f"{'solution count calls':<24} {self.solution_count_calls:10}")
+        lines.append(f"{'intuitive checks':<24} {self.intuitive_checks:10}")
+        return "\n".join(lines)
+
+
+search_stats = SearchStats()
@@ -0,0 +1,78 @@
+import struct
+
+from board.board import Board
+from board.intuitive_deducer import Deduction
+from game.game_config import config
+from tango_types import RULE, SYMBOL, Posn
+
+# a clue of the board or a deduction, clues have no rule
+Step = tuple[Posn, SYMBOL, RULE | None]
+
+# tile index, symbol value, rule value
+DEDUCTION = struct.Struct("<HBB")
+
+
+def encode_deductions(deductions: list[Deduction], grid_size: int) -> bytes:
+    """
+    Encodes deductions as 4 bytes each: the tile index (i * grid_size + j) as 2 bytes, so it fits
+    grids of 16x16 and up, then the symbol's value and the rule's value. They have to be decoded
+    with the same grid size.
+    """
+    return b"".join(
+        DEDUCTION.pack(i * grid_size + j, symbol.value, rule.value) for (i, j), symbol, rule in deductions
+    )
+
+
+def decode_deductions(data: bytes, grid_size: int) -> list[Deduction]:
+    return [
+        (divmod(idx, grid_size), SYMBOL(symbol_value), RULE(rule_value))
+        for idx, symbol_value, rule_value in DEDUCTION.iter_unpack(data)
+    ]
+
+
+class SolveTrace:
+    """
+    Order in which a puzzle can be solved without guessing: its clues, then the deductions found
+    by IntuitiveDeducer, each relying only on the steps before it.
+
+    The next hint is the first step whose tile doesn't hold the step's symbol on the player's
+    board. Every step before it is filled in correctly, so the hinted tile can always be deduced
+    from what the player has (or from a clue they changed). The index of that step only moves
+    back when the player changes a tile before it, so finding the next hint is O(1) amortized.
+    """
+
+    def __init__(self, board: Board, deductions: list[Deduction]):
+        self.steps: list[Step] = []
+        for i in range(config.grid_size):
+            for j in range(config.grid_size):
+                symbol = board.get_symbol_at_posn((i, j))
+                if symbol in (SYMBOL.SUN, SYMBOL.MOON):
+                    self.steps.append(((i, j), symbol, None))
+
+        self.steps += deductions
+
+        # mapping of posn => index of its step
+        self._step_indices = {posn: k for k, (posn, _, _) in enumerate(self.steps)}
+
+        # every step before this one is filled in correctly on the player's board
+        self._next_step = 0
+
+    def on_tile_changed(self, posn: Posn) -> None:
+        self._next_step = min(self._next_step, self._step_indices[posn])
+
+    def reset(self) -> None:
+        self._next_step = 0
+
+    def get_next_step(self, board: Board) -> Step | None:
+        """
+        Returns the first step that isn't filled in on the board, or None if the board is solved.
+        """
+        while self._next_step < len(self.steps):
+            step = self.steps[self._next_step]
+            posn, symbol, _ = step
+            if board.get_symbol_at_posn(posn) != symbol:
+                return step
+
+            self._next_step += 1
+
+        return None
@@ -1,4 +1,8 @@
+from typing import Iterator
+
 from board.board import Board
+from board.intuitive_deducer import IntuitiveDeducer
+from board.search_stats import search_stats
 from tango_types import SIGN, SYMBOL
 from game.game_config import config
 
@@ -6,6 +10,9 @@ from game.game_config import config
 class Solver:
     @staticmethod
     def _solve(board: Board, depth: int) -> bool:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
         # grid is completely filled
         if depth >= (config.grid_size ** 2):
             return board.is_solved()
@@ -13,7 +20,7 @@ class Solver:
         current_posn = (depth // config.grid_size, depth % config.grid_size)
 
         if board.get_symbol_at_posn(current_posn) != SYMBOL.NONE:
-            if not board.is_valid():
+            if not board.is_valid_after(current_posn):
                 return False
             
             return Solver._solve(board, depth + 1)
@@ -21,19 +28,22 @@ class Solver:
         # try putting sun in posn
         board.set_symbol_at_posn(current_posn, SYMBOL.SUN)
 
-        if board.is_valid() and Solver._solve(board, depth + 1):
+        if board.is_valid_after(current_posn) and Solver._solve(board, depth + 1):
             return True
         
         
         # try setting moon
         board.set_symbol_at_posn(current_posn, SYMBOL.MOON)
-        if board.is_valid() and Solver._solve(board, depth + 1):
+        if board.is_valid_after(current_posn) and Solver._solve(board, depth + 1):
             return True
         
 
         # reset board
         board.set_symbol_at_posn(current_posn, SYMBOL.NONE)
 
+        if search_stats.enabled:
+            search_stats.backtracks += 1
+
         return False
 
     @staticmethod
@@ -41,7 +51,48 @@ class Solver:
         return Solver._solve(board, 0)
     
     @staticmethod
-    def _get_num_solutions(board: Board, depth: int) -> int:
+    def _enumerate(board: Board, depth: int) -> Iterator[Board]:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
+        # grid is completely filled
+        if depth >= (config.grid_size ** 2):
+            if board.is_solved():
+                yield board.copy()
+            return
+
+        current_posn = (depth // config.grid_size, depth % config.grid_size)
+
+        if board.get_symbol_at_posn(current_posn) != SYMBOL.NONE:
+            if board.is_valid_after(current_posn):
+                yield from Solver._enumerate(board, depth + 1)
+            return
+
+        for symbol in (SYMBOL.SUN, SYMBOL.MOON):
+            board.set_symbol_at_posn(current_posn, symbol)
+            if board.is_valid_after(current_posn):
+                yield from Solver._enumerate(board, depth + 1)
+
+        # reset board
+        board.set_symbol_at_posn(current_posn, SYMBOL.NONE)
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        """
+        Yields every solution of the board (up to `limit`) as a new board with the same signs.
+        The board itself isn't changed.
+        """
+        for num_found, solution in enumerate(Solver._enumerate(board.copy(), 0)):
+            if limit is not None and num_found >= limit:
+                return
+
+            yield solution
+
+    @staticmethod
+    def _count_solutions(board: Board, depth: int, limit: int | None) -> int:
+        if search_stats.enabled:
+            search_stats.nodes += 1
+
         # grid is completely filled
         if depth >= (config.grid_size ** 2):
             return board.is_solved()
@@ -49,32 +100,60 @@ class Solver:
         current_posn = (depth // config.grid_size, depth % config.grid_size)
 
         if board.get_symbol_at_posn(current_posn) != SYMBOL.NONE:
-            if not board.is_valid():
+            if not board.is_valid_after(current_posn):
                 return 0
             
-            return Solver._get_num_solutions(board, depth + 1)
+            return Solver._count_solutions(board, depth + 1, limit)
 
         num_solutions = 0
 
         # try putting sun in posn
         board.set_symbol_at_posn(current_posn, SYMBOL.SUN)
 
-        if board.is_valid():
-            num_solutions += Solver._get_num_solutions(board, depth + 1)
-        
-        # try setting moon
+        if board.is_valid_after(current_posn):
+            num_solutions += Solver._count_solutions(board, depth + 1, limit)
+
+        # try setting moon, unless we've already found enough solutions
         board.set_symbol_at_posn(current_posn, SYMBOL.MOON)
-        if board.is_valid():
-            num_solutions += Solver._get_num_solutions(board, depth + 1)
+        if (limit is None or num_solutions < limit) and board.is_valid_after(current_posn):
+            num_solutions += Solver._count_solutions(
+                board, depth + 1, None if limit is None else limit - num_solutions
+            )
         
         # reset board
         board.set_symbol_at_posn(current_posn, SYMBOL.NONE)
 
+        if search_stats.enabled and not num_solutions:
+            search_stats.backtracks += 1
+
         return num_solutions
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        """
+        Counts the solutions of the board, stopping as soon as `limit` solutions have been found.
+        The result is exact if it is smaller than `limit`.
+        """
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        return Solver._count_solutions(board, 0, limit)
     
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        """
+        Checks whether the board has a solution other than `solution`, which must be one of its
+        solutions.
+        """
+        return Solver.count_solutions(board, limit=2) > 1
+
     @staticmethod
     def get_num_solutions(board: Board) -> int:
-        return Solver._get_num_solutions(board, 0)
+        return Solver.count_solutions(board)
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        return Solver.count_solutions(board, limit=2) == 1
     
     @staticmethod
     def is_intuitively_solvable(board: Board) -> bool:
@@ -83,51 +162,11 @@ class Solver:
         "intuitively" if placing the complement would make the board invalid (e.g. we have to 
         place a moon at (1, 2) because placing a sun would violate some rule).
 
-        Checking whether a board is "intuitively" solvable is done with the following iterative 
-        algorithm:
-        1. If all tiles on a board are filled, the board is solvable if it is correctly solved
-        2. If the board is invalid, it can never be solved intuitively since placing symbols on 
-        an invalid board just makes another invalid board
-        3. For each empty tile, check if placing either SUN/MOON results in an invalid board. If so,
-        the complement can intuitively be placed
-        4. If no tiles were placed, the board can't be intuitively solved
-        5. Recursively check if the remainder of the board is intuitively solvable
-        6. Remove any placed tiles before returning the result
+        The board is intuitively solvable if placing every symbol that can be placed intuitively,
+        over and over, fills the whole board without breaking a rule. The deductions are made by
+        IntuitiveDeducer, which also knows the rule behind each of them.
         """
-        if board.is_filled():
-            return board.is_solved()
-        elif not board.is_valid():
-            return False
-        
-        placed_symbols = []
-        for i in range(config.grid_size):
-            for j in range(config.grid_size):
-                if board.get_symbol_at_posn((i, j)) != SYMBOL.NONE:
-                    continue
-
-                board.set_symbol_at_posn((i, j), SYMBOL.SUN)
-                if not board.is_valid():
-                    # we know that the moon MUST be here
-                    board.set_symbol_at_posn((i, j), SYMBOL.MOON)
-                    placed_symbols.append((i, j))
-                    continue
-
-                board.set_symbol_at_posn((i, j), SYMBOL.MOON)
-                if not board.is_valid():
-                    # we know that the sun MUST be here
-                    board.set_symbol_at_posn((i, j), SYMBOL.SUN)
-                    placed_symbols.append((i, j))
-                    continue
-
-                board.set_symbol_at_posn((i, j), SYMBOL.NONE)
-
-        if not placed_symbols:
-            return False
-
-        res = Solver.is_intuitively_solvable(board)
-
-        # empty any symbols we've placed
-        for posn in placed_symbols:
-            board.set_symbol_at_posn(posn, SYMBOL.NONE)
-
-        return res
\ No newline at end of file
+        if search_stats.enabled:
+            search_stats.intuitive_checks += 1
+
+        return IntuitiveDeducer(board).is_solvable()
@@ -0,0 +1,138 @@
+from typing import Iterator, Protocol
+
+from board.board import Board
+from board.propagation_solver import PropagationSolver
+from board.row_solver import RowSolver
+from board.sat_solver import SatSolver
+from board.solver import Solver
+from game.game_config import config
+from tango_types import SYMBOL
+
+# boards up to this size with at most this many empty tiles are solved by the plain backtracker,
+# which has no setup cost and barely has to search
+BACKTRACKING_MAX_GRID_SIZE = 6
+BACKTRACKING_MAX_EMPTY_TILES = 4
+
+# boards up to this size with at least this fraction of empty tiles (i.e. hardly any clues, as in
+# the boards reduce_signs searches) are solved row by row, where the signs prune whole rows at
+# once. Propagation takes over on larger grids and on boards with clues, where it barely has to
+# branch.
+ROW_MAX_GRID_SIZE = 8
+ROW_MIN_EMPTY_FRACTION = 0.95
+
+
+class SolverBackend(Protocol):
+    """
+    Interface of the solvers: classes of static methods that take the board to solve, so the
+    class itself is passed around as the backend.
+    """
+
+    @staticmethod
+    def solve(board: Board) -> bool:
+        """
+        Fills the board with a solution, returning False (and leaving the board as it was) if
+        it has none.
+        """
+        ...
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        ...
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        ...
+
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        ...
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        ...
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        ...
+
+    @staticmethod
+    def is_intuitively_solvable(board: Board) -> bool:
+        ...
+
+
+def select_solver_backend(board: Board) -> SolverBackend:
+    """
+    Returns the backend expected to be fastest on the board, going by its grid size and number of
+    empty tiles (see benchmarks/bench.py for the measurements the thresholds come from).
+    """
+    num_empty = sum(
+        board.get_symbol_at_posn((i, j)) not in (SYMBOL.SUN, SYMBOL.MOON)
+        for i in range(config.grid_size)
+        for j in range(config.grid_size)
+    )
+
+    if config.grid_size <= BACKTRACKING_MAX_GRID_SIZE and num_empty <= BACKTRACKING_MAX_EMPTY_TILES:
+        return Solver
+
+    if config.grid_size <= ROW_MAX_GRID_SIZE and num_empty >= ROW_MIN_EMPTY_FRACTION * config.grid_size ** 2:
+        return RowSolver
+
+    return PropagationSolver
+
+
+class AutoSolver:
+    """
+    Solver that hands every call to the backend picked by select_solver_backend for the board,
+    except for has_other_solution.
+    """
+
+    @staticmethod
+    def solve(board: Board) -> bool:
+        return select_solver_backend(board).solve(board)
+
+    @staticmethod
+    def count_solutions(board: Board, limit: int | None = None) -> int:
+        return select_solver_backend(board).count_solutions(board, limit)
+
+    @staticmethod
+    def enumerate_solutions(board: Board, limit: int | None = None) -> Iterator[Board]:
+        return select_solver_backend(board).enumerate_solutions(board, limit)
+
+    @staticmethod
+    def has_other_solution(board: Board, solution: Board) -> bool:
+        # the propagation solver is the only one that starts from the known solution instead of
+        # counting solutions, which beats picking a backend by the board
+        return PropagationSolver.has_other_solution(board, solution)
+
+    @staticmethod
+    def has_unique_solution(board: Board) -> bool:
+        return select_solver_backend(board).has_unique_solution(board)
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        return select_solver_backend(board).get_num_solutions(board)
+
+    @staticmethod
+    def is_intuitively_solvable(board: Board) -> bool:
+        return Solver.is_intuitively_solvable(board)
+
+
+# mapping of name => backend, new backends can be added with register_solver_backend
+SOLVER_BACKENDS: dict[str, SolverBackend] = {
+    "auto": AutoSolver,
+    "backtracking": Solver,
+    "propagation": PropagationSolver,
+    "row": RowSolver,
+    "sat": SatSolver,
+}
+
+
+def register_solver_backend(name: str, backend: SolverBackend) -> None:
+    SOLVER_BACKENDS[name] = backend
+
+
+def get_solver_backend(name: str) -> SolverBackend:
+    if name not in SOLVER_BACKENDS:
+        raise ValueError(f"Unknown solver backend {name}, expected one of {', '.join(SOLVER_BACKENDS)}")
+
+    return SOLVER_BACKENDS[name]
@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+from board.board import Board
+from game.game_config import config
+from tango_types import DIRECTION, SYMBOL, Posn
+from utils import add_posns, direction_to_posn, get_edges
+
+# value of every symbol once suns and moons are swapped
+SWAPPED_SYMBOL_VALUES = {
+    SYMBOL.SUN.value: SYMBOL.MOON.value,
+    SYMBOL.MOON.value: SYMBOL.SUN.value,
+    SYMBOL.SUN_GUESS.value: SYMBOL.MOON_GUESS.value,
+    SYMBOL.MOON_GUESS.value: SYMBOL.SUN_GUESS.value,
+    SYMBOL.NONE.value: SYMBOL.NONE.value,
+}
+
+
+def _get_dihedral_maps(grid_size: int) -> list:
+    last = grid_size - 1
+
+    return [
+        lambda i, j: (i, j),
+        lambda i, j: (j, last - i),
+        lambda i, j: (last - i, last - j),
+        lambda i, j: (last - j, i),
+        lambda i, j: (i, last - j),
+        lambda i, j: (last - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (last - j, last - i),
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_symmetries(grid_size: int) -> list[tuple[list[int], list[int]]]:
+    """
+    Returns the 8 rotations/reflections of the grid as (tile sources, edge sources), where the
+    k-th tile (row-major) of the transformed board comes from tile tile_sources[k] of the original
+    board and likewise for edges in the order of get_edges. An edge can come from an edge going
+    the other way (e.g. a rotated "going right" edge goes down) or from its other end, since every
+    edge is stored from the tile it goes right or down from.
+    """
+    edges = get_edges(grid_size)
+    edge_indices = {edge: index for index, edge in enumerate(edges)}
+
+    symmetries = []
+    for dihedral_map in _get_dihedral_maps(grid_size):
+        tile_sources = [0] * (grid_size ** 2)
+        for i in range(grid_size):
+            for j in range(grid_size):
+                to_i, to_j = dihedral_map(i, j)
+                tile_sources[to_i * grid_size + to_j] = i * grid_size + j
+
+        edge_sources = [0] * len(edges)
+        for index, (from_posn, dir) in enumerate(edges):
+            to_posn = add_posns(from_posn, direction_to_posn(dir))
+            ends: list[Posn] = sorted([dihedral_map(*from_posn), dihedral_map(*to_posn)])
+            mapped_dir = DIRECTION.RIGHT if ends[0][0] == ends[1][0] else DIRECTION.DOWN
+            edge_sources[edge_indices[(ends[0], mapped_dir)]] = index
+
+        symmetries.append((tile_sources, edge_sources))
+
+    return symmetries
+
+
+def get_canonical_key_size(grid_size: int) -> int:
+    num_bits = 3 * grid_size ** 2 + 2 * len(get_edges(grid_size))
+    return 1 + (num_bits + 7) // 8
+
+
+def get_canonical_key(board: Board) -> bytes:
+    """
+    Returns the same key for every board that is a rotation/reflection of this one, with or
+    without suns and moons swapped, and different keys for boards that aren't. Signs stay the same
+    when symbols are swapped since "=" and "x" only compare the tiles on both sides.
+
+    The key is the smallest Board.to_bytes encoding among the 16 transformed boards, so it can be
+    loaded back with Board.from_bytes to get the canonical board itself.
+    """
+    grid_size = config.grid_size
+
+    values = [board.get_symbol_at_posn((i, j)).value for i in range(grid_size) for j in range(grid_size)]
+    swapped_values = [SWAPPED_SYMBOL_VALUES[value] for value in values]
+
+    all_signs = board.get_all_signs()
+    sign_values = []
+    for from_posn, dir in get_edges(grid_size):
+        sign_value = 0
+        for sign_dir, sign in all_signs.get(from_posn, ()):
+            if sign_dir == dir:
+                sign_value = sign.value + 1
+                break
+        sign_values.append(sign_value)
+
+    # same layout as Board.to_bytes: 3 bits per tile, then 2 bits per edge
+    sign_offset = 3 * grid_size ** 2
+    best_key = None
+    for tile_sources, edge_sources in get_symmetries(grid_size):
+        sign_key = 0
+        for offset, index in enumerate(edge_sources):
+            sign_key |= sign_values[index] << (sign_offset + 2 * offset)
+
+        for tile_values in (values, swapped_values):
+            key = sign_key
+            for offset, index in enumerate(tile_sources):
+                key |= tile_values[index] << (3 * offset)
+
+            if best_key is None or key < best_key:
+                best_key = key
+
+    return bytes([grid_size]) + best_key.to_bytes(get_canonical_key_size(grid_size) - 1, "little")
+
+
+def canonicalize(board: Board) -> Board:
+    """
+    Returns the canonical form of the board (see get_canonical_key), of the same board type.
+    """
+    return type(board).from_bytes(get_canonical_key(board))
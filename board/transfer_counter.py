@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from board.board import Board
+from board.line_table import filter_lines, get_row_masks, get_valid_lines, get_vertical_masks
+from board.search_stats import search_stats
+from game.game_config import config
+
+# number of bits used for each column's sun count in a packed column state
+COUNT_BITS = 8
+
+
+def _spread(sun: int, grid_size: int) -> int:
+    """
+    Maps bit j of a row's sun mask to the lowest bit of column j's packed count.
+    """
+    spread = 0
+    for j in range(grid_size):
+        if sun >> j & 1:
+            spread |= 1 << (j * COUNT_BITS)
+
+    return spread
+
+
+class TransferCounter:
+    """
+    Exact solution counter that walks the grid one row at a time. Partial grids are merged into
+    column states made of:
+
+    1. The number of suns in each column (packed COUNT_BITS bits per column)
+    2. The last two rows, which determine the triples/vertical signs for the next row
+
+    and each state keeps the number of ways it can be reached, so the count is computed by
+    dynamic programming over the legal lines (see line_table) instead of enumerating solutions.
+    """
+
+    @staticmethod
+    def _get_full_columns(counts: int, num_rows: int) -> tuple[int, int]:
+        """
+        Returns the masks of columns that already have (size / 2) suns and (size / 2) moons.
+        """
+        half = config.grid_size // 2
+        count_mask = (1 << COUNT_BITS) - 1
+        sun_full = 0
+        moon_full = 0
+
+        for j in range(config.grid_size):
+            sun_count = (counts >> (j * COUNT_BITS)) & count_mask
+            if sun_count == half:
+                sun_full |= 1 << j
+            if num_rows - sun_count == half:
+                moon_full |= 1 << j
+
+        return sun_full, moon_full
+
+    @staticmethod
+    def count_solutions(board: Board) -> int:
+        if search_stats.enabled:
+            search_stats.solution_count_calls += 1
+
+        sun_clues, moon_clues, row_equal, row_times, down_equal, down_times = get_row_masks(board)
+        lines = get_valid_lines(config.grid_size)
+        spreads = {sun: _spread(sun, config.grid_size) for sun in lines}
+
+        # mapping of (packed sun counts, last row, row before last) => number of partial grids
+        states: dict[tuple[int, int | None, int | None], int] = {(0, None, None): 1}
+
+        for i in range(config.grid_size):
+            candidates = filter_lines(lines, sun_clues[i], moon_clues[i], row_equal[i], row_times[i])
+            next_states: dict[tuple[int, int | None, int | None], int] = defaultdict(int)
+
+            for (counts, prev, prev_2), ways in states.items():
+                forbidden, required = TransferCounter._get_full_columns(counts, i)
+
+                vertical_forbidden, vertical_required = get_vertical_masks(
+                    config.grid_size,
+                    prev,
+                    prev_2,
+                    down_equal[i - 1] if i >= 1 else 0,
+                    down_times[i - 1] if i >= 1 else 0,
+                )
+                forbidden |= vertical_forbidden
+                required |= vertical_required
+
+                if forbidden & required:
+                    continue
+
+                for sun in candidates:
+                    if sun & forbidden or sun & required != required:
+                        continue
+
+                    next_states[(counts + spreads[sun], sun, prev)] += ways
+
+            states = next_states
+            if not states:
+                return 0
+
+        # every column has at most (size / 2) of each symbol, so every surviving state is balanced
+        return sum(states.values())
+
+    @staticmethod
+    def get_num_solutions(board: Board) -> int:
+        return TransferCounter.count_solutions(board)
@@ -2,5 +2,11 @@ LINE_THICKNESS = 4
 
 FPS = 60
 
+# smallest grid size puzzles can be generated for, grid sizes must also be even
+MIN_GRID_SIZE = 4
+
 WORKER_COUNT = 1
-QUEUE_SIZE = 10
\ No newline at end of file
+QUEUE_SIZE = 10
+
+# consecutive failed puzzle generations after which the puzzle pool gives up and raises the last error
+MAX_GENERATION_FAILURES = 10
@@ -1,22 +1,45 @@
+import random
 import time
 import pygame
 import pygame.freetype
-from board.generator import Generator
-from board.solver import Solver
-from constants import LINE_THICKNESS
+from board.intuitive_deducer import IntuitiveDeducer
+from board.puzzle_library import PuzzleLibrary
+from board.solve_trace import SolveTrace
+from constants import FPS, LINE_THICKNESS
 from game.button import BUTTON, Button
 from game.game_config import config
-from tango_types import DIRECTION, SIGN, SYMBOL
-from utils import generate_random_posn, grid_to_screen, screen_to_grid
+from game.puzzle_pool import PuzzlePool
+from game.render_cache import RenderCache
+from tango_types import DIRECTION, SYMBOL
+from utils import grid_to_screen, screen_to_grid
+
+# posted every second while a game is running to update the timer
+TIMER_EVENT = pygame.USEREVENT + 1
+
+# posted from a background thread when the puzzle pool finishes generating a puzzle
+PUZZLE_READY_EVENT = pygame.USEREVENT + 2
 
 
 class Game:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, library_path=None, event_driven=True, solver="auto"):
+        self._debug = debug
+
+        # whether run() sleeps until the next event instead of ticking at a fixed frame rate
+        self._event_driven = event_driven
         self._board = None
         self._board_copy = None
         self._solved_board = None
         self._is_board_solved = False
 
+        # boards are drawn from the on-disk library when there is one, and generated otherwise
+        self._puzzle_library = PuzzleLibrary(library_path) if library_path else None
+        self._played_puzzles = set()
+
+        # start generating boards before initializing pygame so the worker processes don't inherit it
+        self._puzzle_pool = PuzzlePool(collect_stats=debug, on_ready=self._on_puzzle_ready, solver=solver, debug=debug)
+        if self._puzzle_library is None or not self._puzzle_library.count(config.grid_size):
+            self._puzzle_pool.fill(config.grid_size)
+
         # initialize game
         pygame.init()
         pygame.font.init()
@@ -29,6 +52,7 @@ class Game:
         self._large_font = pygame.freetype.SysFont("Comic Sans MS", 60)
         self._small_font = pygame.freetype.SysFont("Comic Sans MS", 20)
         self._text_panel_color = (0, 0, 0)
+        self._render_cache = RenderCache(self._large_font)
 
         # set up buttons
         new_game_button = Button("New Game", (200, 50), self._small_font)
@@ -67,18 +91,65 @@ class Game:
         self._should_exit = False
         self._is_loading = False
 
-        self._new_game()
+        # regions of the screen that changed since the last frame, frames with nothing to redraw
+        # are skipped
+        self._dirty_rects = []
+        self._needs_full_redraw = True
+
+        # text panel contents as of the last frame, (text, color)
+        self._drawn_text_panel = None
+
+        self._new_game(*self._get_puzzle(block=True))
+
+    def _get_library_puzzle(self):
+        # only hand out puzzles that haven't been played this session
+        num_puzzles = self._puzzle_library.count(config.grid_size)
+        if len(self._played_puzzles) >= num_puzzles:
+            return None
+
+        index = random.randrange(num_puzzles)
+        while index in self._played_puzzles:
+            index = random.randrange(num_puzzles)
+
+        self._played_puzzles.add(index)
+        board, solved_board = self._puzzle_library.get(config.grid_size, index)
+
+        # the library doesn't store the order the puzzle is solved in, deducing it takes a few ms
+        return board, solved_board, IntuitiveDeducer(board).get_deductions()
+
+    def _get_puzzle(self, block=False):
+        if self._puzzle_library is not None:
+            puzzle = self._get_library_puzzle()
+            if puzzle is not None:
+                return puzzle
 
-    def _new_game(self):
-        self._board = Generator.generate()
+        puzzle = self._puzzle_pool.get(config.grid_size, block=block)
+        if puzzle is not None and self._debug:
+            print(self._puzzle_pool.last_stats)
+
+        # keep generated boards around for the next runs
+        if puzzle is not None and self._puzzle_library is not None:
+            self._played_puzzles.add(self._puzzle_library.add(*puzzle[:2]))
+
+        return puzzle
+
+    def _new_game(self, board, solved_board, deductions):
+        if self._debug:
+            board.print_board()
+
+        self._board = board
         self._board_copy = self._board.copy()
-        self._solved_board = self._board.copy()
-        Solver.solve(self._solved_board)
+        self._solved_board = solved_board
+        self._solve_trace = SolveTrace(board, deductions)
 
         self._start_time = time.time()
         self._elapsed_time = 0
         self._is_board_solved = False
         self._text_panel_color = (0, 0, 0)
+        self._mark_dirty()
+
+        # restart the timer so its ticks line up with the seconds of the new game
+        pygame.time.set_timer(TIMER_EVENT, 1000)
 
     def _give_up(self):
         if self._is_board_solved:
@@ -87,29 +158,79 @@ class Game:
         self._board = self._solved_board
         self._is_board_solved = True
         self._text_panel_color = (255, 0, 0)
+        self._mark_dirty()
 
     def _get_hint(self):
         if self._is_board_solved:
             return
         
-        while True:
-            posn = generate_random_posn()
-            symbol = self._board.get_symbol_at_posn(posn)
-            hint = self._solved_board.get_symbol_at_posn(posn)
-            if symbol != hint:
-                self._board.set_symbol_at_posn(posn, hint)
-                self._is_board_solved = self._board.is_solved()
-                break
+        # fill in the first tile of the solve trace the player hasn't, which follows from the tiles
+        # before it in the trace
+        step = self._solve_trace.get_next_step(self._board)
+        if step is None:
+            return
+
+        posn, hint, _ = step
+        self._board.set_symbol_at_posn(posn, hint)
+        self._mark_dirty(self._get_tile_rect(posn))
+        self._is_board_solved = self._board.is_solved()
+        if self._is_board_solved:
+            self._text_panel_color = (0, 255, 0)
 
     def _reset_game(self):
-        self._is_loading = True
-        self.on_draw()
-        self._new_game()
-        self._is_loading = False
+        puzzle = self._get_puzzle()
+        if puzzle is None:
+            # no board is ready yet, on_tick picks one up once it's generated
+            self._is_loading = True
+            return
+
+        self._new_game(*puzzle)
+
+    def _on_puzzle_ready(self):
+        # runs on the pool's thread, pygame's event queue is safe to post to from any thread once
+        # the display is up
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(PUZZLE_READY_EVENT))
+
+    def _poll_puzzle_pool(self):
+        puzzle = self._get_puzzle()
+        if puzzle is not None:
+            self._is_loading = False
+            self._new_game(*puzzle)
 
     def _clear_board(self):
         self._board = self._board_copy
         self._board_copy = self._board.copy()
+        self._solve_trace.reset()
+        self._mark_dirty()
+
+    def _mark_dirty(self, rect=None):
+        """
+        Marks a region of the screen to be redrawn on the next frame, or the whole screen if no
+        region is given.
+        """
+        if rect is None:
+            self._needs_full_redraw = True
+        else:
+            self._dirty_rects.append(rect)
+
+    def _get_tile_rect(self, posn):
+        r = pygame.Rect(
+            (0, 0),
+            (
+                config._grid_pixel_width // config.grid_size,
+                config._grid_pixel_height // config.grid_size,
+            ),
+        )
+        r.center = grid_to_screen(posn)
+
+        return r
+
+    def _get_text_panel_rect(self):
+        # the text is centered one line below the top of the panel, see _draw_text_panel
+        return pygame.Rect(
+            config._grid_pixel_width, 0, config._side_panel_width, 2 * self._large_font.get_sized_height()
+        )
 
     def _draw_board_background(self):
         # draw vertical lines
@@ -137,75 +258,30 @@ class Game:
                 tile_center = grid_to_screen((i, j))
 
                 # add colors
-                r = pygame.Rect(
-                    (0, 0),
-                    (
-                        config._grid_pixel_width // config.grid_size,
-                        config._grid_pixel_height // config.grid_size,
-                    ),
-                )
-                r.center = tile_center
+                r = self._get_tile_rect((i, j))
                 pygame.draw.rect(self._screen, (255, 255, 255), r)
 
                 # draw symbols
-                match symbol:
-                    case SYMBOL.SUN:
-                        img = pygame.image.load("assets/my_queen.png").convert_alpha()
-                        img = pygame.transform.scale_by(img, 0.10)
-                        img_rect = img.get_rect()
-                        img_rect.center = tile_center
-                        self._screen.blit(img, img_rect.topleft)
-                    case SYMBOL.MOON:
-                        img = pygame.image.load("assets/moon.png").convert_alpha()
-                        img = pygame.transform.scale_by(img, 0.10)
-                        img_rect = img.get_rect()
-                        img_rect.center = tile_center
-                        self._screen.blit(img, img_rect.topleft)
-                    case SYMBOL.SUN_GUESS:
-                        img = pygame.image.load("assets/my_queen.png").convert_alpha()
-                        img.set_alpha(50)
-                        img = pygame.transform.scale_by(img, 0.10)
-                        img_rect = img.get_rect()
-                        img_rect.center = tile_center
-                        self._screen.blit(img, img_rect.topleft)
-
-                        text_rect = self._large_font.get_rect("?")
-                        text_rect.center = tile_center
-                        self._large_font.render_to(self._screen, text_rect.topleft, "?", (0, 0, 0))
-                    case SYMBOL.MOON_GUESS:
-                        img = pygame.image.load("assets/moon.png").convert_alpha()
-                        img.set_alpha(50)
-                        img = pygame.transform.scale_by(img, 0.10)
-                        img_rect = img.get_rect()
-                        img_rect.center = tile_center
-                        self._screen.blit(img, img_rect.topleft)
-
-                        text_rect = self._large_font.get_rect("?")
-                        text_rect.center = tile_center
-                        self._large_font.render_to(self._screen, text_rect.topleft, "?", (0, 0, 0))
+                img = self._render_cache.get_symbol_image(symbol)
+                if img is not None:
+                    img_rect = img.get_rect()
+                    img_rect.center = tile_center
+                    self._screen.blit(img, img_rect.topleft)
+
+                if symbol in (SYMBOL.SUN_GUESS, SYMBOL.MOON_GUESS):
+                    glyph, glyph_size = self._render_cache.get_guess_glyph()
+                    text_rect = pygame.Rect((0, 0), glyph_size)
+                    text_rect.center = tile_center
+                    self._screen.blit(glyph, text_rect.topleft)
 
     def _draw_signs(self):
         # draw signs
         for from_posn, sign_set in self._board.get_all_signs().items():
-            tile_center = grid_to_screen(from_posn)
-
             # dummy rectangle to get the correct positioning
-            r = pygame.Rect(
-                    (0, 0),
-                    (
-                        config._grid_pixel_width // config.grid_size,
-                        config._grid_pixel_height // config.grid_size,
-                    ),
-                )
-            r.center = tile_center
+            r = self._get_tile_rect(from_posn)
 
             for direction, sign in sign_set:
-                sign_str = None
-                match sign:
-                    case SIGN.EQUAL:
-                        sign_str = "="
-                    case SIGN.TIMES:
-                        sign_str = "x"
+                glyph, glyph_size = self._render_cache.get_sign_glyph(sign)
 
                 sign_center = None
                 horiz_scale = 1
@@ -224,17 +300,17 @@ class Game:
                         sign_center = r.midright
                         vert_scale = 2
 
-                assert sign_str is not None and sign_center is not None
+                assert sign_center is not None
 
-                text_rect_background = self._large_font.get_rect(sign_str)
+                text_rect_background = pygame.Rect((0, 0), glyph_size)
                 text_rect_background.w *= horiz_scale
                 text_rect_background.h *= vert_scale
                 text_rect_background.center = sign_center
                 pygame.draw.rect(self._screen, (255, 255, 255), text_rect_background)
 
-                text_rect = self._large_font.get_rect(sign_str)
+                text_rect = pygame.Rect((0, 0), glyph_size)
                 text_rect.center = sign_center
-                self._large_font.render_to(self._screen, text_rect.topleft, sign_str, (0, 0, 0))
+                self._screen.blit(glyph, text_rect.topleft)
 
     def _draw_text_panel(self, text_str: str):
         text_rect = self._large_font.get_rect(text_str)
@@ -257,27 +333,55 @@ class Game:
 
         return f"{elapsed_minutes}:{elapsed_seconds}"
 
-    def on_draw(self):
+    def _get_text_panel_str(self):
+        if self._is_loading:
+            return "Loading..."
+
+        return self._calculate_time_str()
+
+    def _draw_frame(self, clip=None):
         self._screen.fill((255, 255, 255))
         self._draw_board()
         self._draw_board_background()
         self._draw_signs()
 
-        text_panel_str = None
-        if self._is_loading:
-            text_panel_str = "Loading..."
-        else:
-            text_panel_str = self._calculate_time_str()
-        
-        self._draw_text_panel(text_panel_str)
+        # freetype ignores the clip area when rendering text, so text is only drawn when its
+        # region is being redrawn
+        if clip is None or clip.colliderect(self._get_text_panel_rect()):
+            self._draw_text_panel(self._get_text_panel_str())
 
         for button in self._buttons.values():
-            button.draw(self._screen)
+            if clip is None or clip.colliderect(button.button_rect):
+                button.draw(self._screen)
 
-        pygame.display.flip()
+    def on_draw(self):
+        """
+        Redraws the regions marked dirty since the last frame and pushes only those to the
+        display. Every layer is drawn clipped to a dirty region, so overlapping tiles, signs and
+        grid lines stay consistent. Nothing is drawn if nothing changed.
+        """
+        # the timer only changes once a second, and the panel color when the game ends
+        text_panel = (self._get_text_panel_str(), self._text_panel_color)
+        if text_panel != self._drawn_text_panel:
+            self._drawn_text_panel = text_panel
+            self._mark_dirty(self._get_text_panel_rect())
+
+        if self._needs_full_redraw:
+            self._draw_frame()
+            pygame.display.flip()
+        elif self._dirty_rects:
+            for rect in self._dirty_rects:
+                self._screen.set_clip(rect)
+                self._draw_frame(rect)
+
+            self._screen.set_clip(None)
+            pygame.display.update(self._dirty_rects)
+
+        self._needs_full_redraw = False
+        self._dirty_rects = []
 
     def _on_grid_click(self, screen_posn, mouse_button):
-        if self._is_board_solved:
+        if self._is_board_solved or self._is_loading:
             return
 
         i, j = screen_posn
@@ -310,6 +414,8 @@ class Game:
                 case _:
                     raise ValueError(f"Invalid mouse click")
                 
+            self._solve_trace.on_tile_changed((tile_i, tile_j))
+            self._mark_dirty(self._get_tile_rect((tile_i, tile_j)))
             self._is_board_solved = self._board.is_solved()
             if self._is_board_solved:
                 self._text_panel_color = (0, 255, 0)
@@ -328,19 +434,46 @@ class Game:
                 self._should_exit = True
             case pygame.MOUSEBUTTONUP:
                 self.on_click(pygame.mouse.get_pos(), event.button)
+            case pygame.WINDOWEXPOSED:
+                self._mark_dirty()
+
+    def _update(self):
+        if self._is_loading:
+            self._poll_puzzle_pool()
+
+        if not self._is_board_solved:
+            self._elapsed_time = int(time.time() - self._start_time)
 
     def on_tick(self):
         for event in pygame.event.get():
             self.on_event(event)
 
-        if not self._is_board_solved:
-            self._elapsed_time = int(time.time() - self._start_time)
+        self._update()
+        self.on_draw()
+        self._clock.tick(FPS)
+
+    def on_wait(self):
+        """
+        Sleeps until the next event, then handles every queued event and redraws. Besides user
+        input, the process is only woken up by TIMER_EVENT once a second and by PUZZLE_READY_EVENT
+        when a board finishes generating.
+        """
+        self.on_event(pygame.event.wait())
+        for event in pygame.event.get():
+            self.on_event(event)
 
+        self._update()
         self.on_draw()
-        self._clock.tick(60)
 
     def run(self):
         while not self._should_exit:
-            self.on_tick()
+            if self._event_driven:
+                self.on_wait()
+            else:
+                self.on_tick()
+
+        self._puzzle_pool.shutdown()
+        if self._puzzle_library is not None:
+            self._puzzle_library.close()
 
         pygame.quit()
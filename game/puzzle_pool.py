@@ -0,0 +1,184 @@
+import random
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from board.bitboard import BitBoard
+from board.board import Board
+from board.generator import Generator
+from board.intuitive_deducer import Deduction
+from board.search_stats import SearchStats
+from board.solve_trace import decode_deductions, encode_deductions
+from board.solver_backends import get_solver_backend
+from constants import MAX_GENERATION_FAILURES, QUEUE_SIZE, WORKER_COUNT
+from game.game_config import config
+
+
+def _init_worker(solver: str) -> None:
+    # forked workers inherit the parent's random state, reseed so they don't generate the same boards
+    random.seed()
+    Generator.solver = get_solver_backend(solver)
+
+
+def _generate_puzzle(grid_size: int, collect_stats: bool) -> tuple[bytes, bytes, bytes, SearchStats | None]:
+    config.grid_size = grid_size
+
+    if collect_stats:
+        (board, deductions), stats = Generator.run_with_stats(Generator.generate_with_trace)
+    else:
+        (board, deductions), stats = Generator.generate_with_trace(), None
+
+    solved_board = board.copy()
+    Generator.solver.solve(solved_board)
+
+    # boards are sent back to the game as bytes, which are much cheaper to pickle than boards
+    return board.to_bytes(), solved_board.to_bytes(), encode_deductions(deductions, grid_size), stats
+
+
+class PuzzlePool:
+    """
+    Keeps up to `queue_size` generated puzzles (see get()) ready for every grid size that
+    has been asked for, refilling them in the background with `worker_count` processes.
+
+    With `collect_stats`, the generation stats of the last puzzle handed out by get() are kept in
+    `last_stats`. `on_ready` is called from a background thread every time a puzzle finishes
+    generating, so callers can wake up instead of polling get(). Puzzles are solved and checked
+    with the solver backend named `solver` (see solver_backends).
+
+    Puzzles whose generation fails are dropped and generated again, and the workers are restarted
+    if one of them dies, printing the error with `debug`. Once `max_failures` puzzles in a row have
+    failed, the last error is raised from fill()/get() instead, so a persistent failure can't keep
+    get() from ever returning.
+    """
+
+    def __init__(
+        self,
+        worker_count: int = WORKER_COUNT,
+        queue_size: int = QUEUE_SIZE,
+        collect_stats: bool = False,
+        on_ready: Callable[[], None] | None = None,
+        solver: str = "auto",
+        debug: bool = False,
+        max_failures: int = MAX_GENERATION_FAILURES,
+    ):
+        self._worker_count = worker_count
+        self._solver = solver
+        self._executor = self._start_executor()
+        self._queue_size = queue_size
+        self._collect_stats = collect_stats
+        self._on_ready = on_ready
+        self._debug = debug
+        self._max_failures = max_failures
+        self._failure_count = 0
+        self.last_stats: SearchStats | None = None
+
+        # mapping of grid size => encoded puzzles ready to be handed out
+        self._ready: dict[int, deque[tuple[bytes, bytes, bytes, SearchStats | None]]] = defaultdict(deque)
+
+        # mapping of grid size => puzzles being generated
+        self._pending: dict[int, list[Future]] = defaultdict(list)
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._worker_count, initializer=_init_worker, initargs=(self._solver,)
+        )
+
+    def _collect(self, grid_size: int) -> None:
+        done = []
+        still_pending = []
+        for future in self._pending[grid_size]:
+            if future.done():
+                done.append(future)
+            else:
+                still_pending.append(future)
+
+        self._pending[grid_size] = still_pending
+
+        # raised once every finished puzzle is collected, so none is lost or collected twice
+        last_error = None
+        for future in done:
+            # failed puzzles are dropped, fill() starts new ones in their place
+            if future.cancelled():
+                continue
+
+            if future.exception() is not None:
+                if self._record_failure(grid_size, future.exception()):
+                    last_error = future.exception()
+                continue
+
+            self._failure_count = 0
+            self._ready[grid_size].append(future.result())
+
+        if last_error is not None:
+            raise last_error
+
+    def _record_failure(self, grid_size: int, error: BaseException) -> bool:
+        """
+        Counts a failed puzzle, returning whether `max_failures` puzzles in a row have failed.
+        """
+        if self._debug:
+            print(f"Generating a {grid_size}x{grid_size} puzzle failed: {error!r}")
+
+        self._failure_count += 1
+        if self._failure_count < self._max_failures:
+            return False
+
+        # start counting again in case the caller retries
+        self._failure_count = 0
+        return True
+
+    def fill(self, grid_size: int) -> None:
+        """
+        Starts generating puzzles until `queue_size` are either ready or in progress.
+        """
+        self._collect(grid_size)
+
+        while len(self._ready[grid_size]) + len(self._pending[grid_size]) < self._queue_size:
+            try:
+                future = self._executor.submit(_generate_puzzle, grid_size, self._collect_stats)
+            except BrokenProcessPool as error:
+                # a worker died, which fails every puzzle in progress and the pool with them
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._start_executor()
+                if self._record_failure(grid_size, error):
+                    raise
+                continue
+
+            if self._on_ready is not None:
+                future.add_done_callback(self._on_future_done)
+
+            self._pending[grid_size].append(future)
+
+    def _on_future_done(self, future: Future) -> None:
+        if not future.cancelled():
+            self._on_ready()
+
+    def get(self, grid_size: int, block: bool = False) -> tuple[Board, Board, list[Deduction]] | None:
+        """
+        Returns a (board, solved board, deductions) triple, where the deductions solve the board
+        in order (see IntuitiveDeducer.get_deductions), or None if none is ready and `block` is
+        False.
+        """
+        self.fill(grid_size)
+
+        while block and not self._ready[grid_size]:
+            wait(self._pending[grid_size], return_when=FIRST_COMPLETED)
+
+            # also replaces the puzzles that failed
+            self.fill(grid_size)
+
+        if not self._ready[grid_size]:
+            return None
+
+        board_bytes, solved_board_bytes, deduction_bytes, self.last_stats = self._ready[grid_size].popleft()
+        self.fill(grid_size)
+
+        return (
+            BitBoard.from_bytes(board_bytes),
+            BitBoard.from_bytes(solved_board_bytes),
+            decode_deductions(deduction_bytes, grid_size),
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
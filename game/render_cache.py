@@ -0,0 +1,85 @@
+import pygame
+import pygame.freetype
+
+from game.game_config import config
+from tango_types import SIGN, SYMBOL
+
+# scale applied to the symbol images
+IMAGE_SCALE = 0.10
+
+# alpha of the faded image drawn for guesses
+GUESS_ALPHA = 50
+
+SYMBOL_IMAGE_PATHS = {
+    SYMBOL.SUN: "assets/my_queen.png",
+    SYMBOL.MOON: "assets/moon.png",
+}
+
+SIGN_STRS = {
+    SIGN.EQUAL: "=",
+    SIGN.TIMES: "x",
+}
+
+
+class RenderCache:
+    """
+    Holds the surfaces drawn every frame so they are built once instead of on every draw:
+
+    1. The scaled image of every symbol, with guesses using a faded copy of the image
+    2. The "?" drawn over guesses and the "=" / "x" sign glyphs
+
+    Everything is built for the tile size of the current grid size and rebuilt when it changes.
+    """
+
+    def __init__(self, font: pygame.freetype.Font):
+        self._font = font
+        self._grid_size = None
+
+        # mapping of symbol => scaled image, NONE has no image
+        self._symbol_images: dict[SYMBOL, pygame.Surface] = {}
+
+        # mapping of sign => (glyph, glyph size)
+        self._sign_glyphs: dict[SIGN, tuple[pygame.Surface, tuple[int, int]]] = {}
+
+        self._guess_glyph: tuple[pygame.Surface, tuple[int, int]] | None = None
+
+    def _build(self) -> None:
+        self._symbol_images = {}
+        for symbol, path in SYMBOL_IMAGE_PATHS.items():
+            img = pygame.image.load(path).convert_alpha()
+            self._symbol_images[symbol] = pygame.transform.scale_by(img, IMAGE_SCALE)
+
+            # fade before scaling, like the image was drawn before it was cached
+            guess_img = img.copy()
+            guess_img.set_alpha(GUESS_ALPHA)
+            guess_symbol = SYMBOL.SUN_GUESS if symbol == SYMBOL.SUN else SYMBOL.MOON_GUESS
+            self._symbol_images[guess_symbol] = pygame.transform.scale_by(guess_img, IMAGE_SCALE)
+
+        self._sign_glyphs = {sign: self._render_glyph(sign_str) for sign, sign_str in SIGN_STRS.items()}
+        self._guess_glyph = self._render_glyph("?")
+
+        self._grid_size = config.grid_size
+
+    def _render_glyph(self, text_str: str) -> tuple[pygame.Surface, tuple[int, int]]:
+        surface, rect = self._font.render(text_str, (0, 0, 0))
+        return surface, rect.size
+
+    def _ensure_built(self) -> None:
+        if self._grid_size != config.grid_size:
+            self._build()
+
+    def get_symbol_image(self, symbol: SYMBOL) -> pygame.Surface | None:
+        self._ensure_built()
+        return self._symbol_images.get(symbol)
+
+    def get_guess_glyph(self) -> tuple[pygame.Surface, tuple[int, int]]:
+        self._ensure_built()
+        return self._guess_glyph
+
+    def get_sign_glyph(self, sign: SIGN) -> tuple[pygame.Surface, tuple[int, int]]:
+        """
+        Returns the glyph of a sign and its size, which is also the size of the background drawn
+        behind it before stretching.
+        """
+        self._ensure_built()
+        return self._sign_glyphs[sign]
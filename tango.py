@@ -1,13 +1,72 @@
-
 import argparse
+import os
 
-from game.game import Game
+from board.batch_generator import BatchGenerator
+from board.puzzle_library import PuzzleLibrary
+from board.solver_backends import SOLVER_BACKENDS
+from constants import MIN_GRID_SIZE, WORKER_COUNT
+from game.game_config import config
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-d", "--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("-l", "--library", help="Directory of the puzzle library to play from")
+    parser.add_argument("--polling", action="store_true", help="Redraw at a fixed frame rate instead of waiting for events")
+    parser.add_argument("--solver", choices=list(SOLVER_BACKENDS), default="auto", help="Solver backend used to generate boards")
+
+    subparsers = parser.add_subparsers(dest="command")
+    generate_parser = subparsers.add_parser("generate", help="Generate a batch of puzzles without opening the game")
+    generate_parser.add_argument("-n", "--num-puzzles", type=int, default=10, help="Number of puzzles to generate")
+    generate_parser.add_argument("-s", "--grid-size", type=int, default=config.grid_size, help="Width/height of the puzzles")
+    generate_parser.add_argument("-w", "--workers", type=int, default=WORKER_COUNT, help="Number of worker processes")
+    generate_parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible batches")
+    generate_parser.add_argument("-f", "--format", choices=["jsonl", "binary"], default="jsonl", help="Output format")
+    generate_parser.add_argument("-o", "--output", required=True, help="JSONL file or puzzle library directory to write to")
+    # suppressed so it doesn't overwrite a --solver given before the subcommand
+    generate_parser.add_argument("--solver", choices=list(SOLVER_BACKENDS), default=argparse.SUPPRESS, help="Solver backend used to generate puzzles")
+
+    verify_parser = subparsers.add_parser("verify", help="Check every puzzle of a puzzle library against its solution")
+    verify_parser.add_argument("library", help="Directory of the puzzle library to check")
     args = parser.parse_args()
 
-    game = Game(debug=args.debug)
-    game.run()
+    if args.command == "generate":
+        if args.grid_size < MIN_GRID_SIZE or args.grid_size % 2:
+            generate_parser.error(f"grid size must be even and at least {MIN_GRID_SIZE}")
+
+        BatchGenerator.generate(
+            args.num_puzzles,
+            args.grid_size,
+            args.output,
+            output_format=args.format,
+            worker_count=args.workers,
+            seed=args.seed,
+            solver=args.solver,
+        )
+    elif args.command == "verify":
+        # PuzzleLibrary creates missing directories, which would hide a mistyped path
+        if not os.path.isdir(args.library):
+            parser.error(f"{args.library} is not a directory")
+
+        library = PuzzleLibrary(args.library)
+        collections = library.get_collections()
+        if not collections:
+            library.close()
+            parser.error(f"{args.library} has no puzzle files")
+
+        num_invalid = 0
+        for grid_size, difficulty in collections:
+            is_consistent = library.verify(grid_size, difficulty)
+            num_invalid += (~is_consistent).sum()
+            print(f"{grid_size}x{grid_size} difficulty {difficulty}: {len(is_consistent)} puzzles, {(~is_consistent).sum()} invalid")
+        library.close()
+
+        # fail so scripts re-verifying the library after a generator change notice
+        if num_invalid:
+            parser.exit(1, f"{args.library} has {num_invalid} invalid puzzles\n")
+    else:
+        # pygame is only needed to play
+        from game.game import Game
+
+        game = Game(debug=args.debug, library_path=args.library, event_driven=not args.polling, solver=args.solver)
+        game.run()
@@ -18,4 +18,15 @@ class DIRECTION(Enum):
     UP = 0
     DOWN = 1
     LEFT = 2
-    RIGHT = 3
\ No newline at end of file
+    RIGHT = 3
+
+
+class RULE(Enum):
+    # a row/column already has (size / 2) of one symbol
+    SATURATION = 0
+    # two equal tiles next to each other
+    PAIR = 1
+    # two equal tiles with one tile between them
+    SANDWICH = 2
+    # a "=" or "x" to a filled tile
+    SIGN = 3
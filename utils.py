@@ -1,4 +1,5 @@
 import random
+from functools import lru_cache
 from game.game_config import config
 from tango_types import DIRECTION, SYMBOL, Posn
 
@@ -46,6 +47,23 @@ def posns_to_direction(from_posn: Posn, to_posn: Posn) -> DIRECTION:
         
     raise ValueError(f"Expected posns to have a difference of magnitude 1, got {diff_posn} instead")
 
+@lru_cache(maxsize=None)
+def get_edges(grid_size: int) -> list[tuple[Posn, DIRECTION]]:
+    """
+    Returns every (from posn, direction) a sign can be placed on, going right row by row and then
+    going down row by row.
+    """
+    edges = []
+    for i in range(grid_size):
+        for j in range(grid_size - 1):
+            edges.append(((i, j), DIRECTION.RIGHT))
+
+    for i in range(grid_size - 1):
+        for j in range(grid_size):
+            edges.append(((i, j), DIRECTION.DOWN))
+
+    return edges
+
 def grid_to_screen(grid_posn):
     i, j = grid_posn
 